@@ -0,0 +1,216 @@
+import os
+import re
+import sys
+import fnmatch
+import tarfile
+import zipfile
+
+ARCHIVE_EXTENSIONS = ['*.zip', '*.tar', '*.tar.gz', '*.tgz', '*.tar.bz2', '*.tbz2', '*.tar.xz', '*.txz']
+
+# Archive members are addressed as "bundle.zip!day1/reel_01.jpg"
+MEMBER_SEPARATOR = '!'
+
+_ARCHIVE_SUFFIXES = '|'.join(re.escape(ext[1:]) for ext in ARCHIVE_EXTENSIONS)
+_MEMBER_PATH = re.compile(rf'^(.+?(?:{_ARCHIVE_SUFFIXES})){re.escape(MEMBER_SEPARATOR)}(.+)$', re.IGNORECASE)
+
+
+def is_archive(path):
+    """True when path has a zip/tar archive extension"""
+    name = path.lower()
+    return any(name.endswith(ext[1:]) for ext in ARCHIVE_EXTENSIONS)
+
+
+def member_path(archive_path, member_name):
+    """Path string for a member of an archive"""
+    return f"{archive_path}{MEMBER_SEPARATOR}{member_name}"
+
+
+def split_member_path(path):
+    """
+    Split "bundle.zip!day1/reel.jpg" into ("bundle.zip", "day1/reel.jpg")
+    
+    Plain paths (including real files whose name happens to contain "!")
+    come back as (path, None).
+    """
+    match = _MEMBER_PATH.match(path)
+    if match and not os.path.exists(path):
+        return match.group(1), match.group(2)
+    return path, None
+
+
+def display_name(path):
+    """Short name for output: the file name, or "bundle.zip!day1/reel.jpg" for an archive member"""
+    archive_path, member = split_member_path(path)
+    if member is None:
+        return os.path.basename(path)
+    return member_path(os.path.basename(archive_path), member)
+
+
+def absolute_path(path):
+    """os.path.abspath that leaves the member part of an archive member path untouched"""
+    archive_path, member = split_member_path(path)
+    if member is None:
+        return os.path.abspath(path)
+    return member_path(os.path.abspath(archive_path), member)
+
+
+def path_exists(path):
+    """os.path.exists that also accepts archive member paths (checks the archive)"""
+    return os.path.exists(split_member_path(path)[0])
+
+
+def _wanted(name, extensions):
+    """Member name has one of the extensions and is not a macOS resource fork"""
+    base = os.path.basename(name)
+    if not base or base.startswith('._') or name.startswith('__MACOSX/'):
+        return False
+    return any(fnmatch.fnmatch(base.lower(), ext.lower()) for ext in extensions)
+
+
+def list_archive_images(archive_path, extensions):
+    """
+    List the image members of a zip or tar archive in archive order
+    
+    Args:
+        archive_path: .zip / .tar / .tar.gz / ... file
+        extensions: Glob patterns of member names to keep (e.g. ['*.jpg', '*.png'])
+    
+    Returns:
+        list: (member path, uncompressed size) tuples
+    """
+    members = []
+    
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _wanted(info.filename, extensions):
+                    members.append((member_path(archive_path, info.filename), info.file_size))
+    else:
+        with tarfile.open(archive_path, 'r:*') as archive:
+            for info in archive:
+                if info.isfile() and _wanted(info.name, extensions):
+                    members.append((member_path(archive_path, info.name), info.size))
+    
+    return members
+
+
+def read_archive_member(path):
+    """
+    Read one archive member into memory
+    
+    Random access: cheap for zip files, but a compressed tar is decompressed up
+    to the member. Use iter_member_bytes() for many members of one archive.
+    """
+    archive_path, member = split_member_path(path)
+    if member is None:
+        raise ValueError(f"Not an archive member path: {path}")
+    
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            return archive.read(member)
+    
+    with tarfile.open(archive_path, 'r:*') as archive:
+        extracted = archive.extractfile(member)
+        if extracted is None:
+            raise KeyError(f"{member} is not a regular file in {archive_path}")
+        return extracted.read()
+
+
+class _SequentialReader:
+    """Reads members of one archive, moving forward through tar streams"""
+    
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.zip = zipfile.ZipFile(archive_path) if zipfile.is_zipfile(archive_path) else None
+        self.tar = None
+    
+    def read(self, member):
+        if self.zip is not None:
+            return self.zip.read(member)
+        
+        if self.tar is None:
+            self.tar = tarfile.open(self.archive_path, 'r|*')
+        while True:
+            info = self.tar.next()
+            if info is None:
+                break
+            if info.name == member and info.isfile():
+                return self.tar.extractfile(info).read()
+        
+        # Behind the stream (out of order) or missing: fall back to random access
+        self.tar.close()
+        self.tar = None
+        return read_archive_member(member_path(self.archive_path, member))
+    
+    def close(self):
+        for handle in (self.zip, self.tar):
+            if handle is not None:
+                handle.close()
+
+
+class MemberReader:
+    """
+    Reads archive member paths one after another, keeping the current archive open
+    
+    Tar files (.tar.gz included) are read as a stream, so members requested in
+    archive order cost a single decompression pass per archive instead of one
+    per member (read_archive_member). Use it where paths arrive one at a time,
+    e.g. queue workers; iter_member_bytes() wraps it for a list of paths.
+    """
+    
+    def __init__(self):
+        self._reader = None
+    
+    def read(self, path):
+        """Bytes of one archive member"""
+        archive_path, member = split_member_path(path)
+        if member is None:
+            raise ValueError(f"Not an archive member path: {path}")
+        if self._reader is None or self._reader.archive_path != archive_path:
+            self.close()
+            self._reader = _SequentialReader(archive_path)
+        return self._reader.read(member)
+    
+    def close(self):
+        if self._reader is not None:
+            reader, self._reader = self._reader, None  # never reuse a closed reader
+            reader.close()
+
+
+def iter_member_bytes(member_paths):
+    """
+    Yield (member path, bytes, error) for archive member paths without extracting to disk
+    
+    Consecutive members of one archive share one open archive, and tar files
+    (.tar.gz included) are read as a stream, so members listed in archive order
+    cost a single decompression pass. Only the current member is held in memory.
+    A member that cannot be read is yielded with bytes None and the exception.
+    """
+    reader = MemberReader()
+    try:
+        for path in member_paths:
+            try:
+                data = reader.read(path)
+            except Exception as e:
+                yield path, None, e
+                continue
+            yield path, data, None
+    finally:
+        reader.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python archive_ingest.py <archive> [pattern ...]")
+        print(f"   Archives: {', '.join(ARCHIVE_EXTENSIONS)}")
+        return
+    
+    extensions = sys.argv[2:] or ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tiff', '*.gif']
+    members = list_archive_images(sys.argv[1], extensions)
+    print(f"📦 {sys.argv[1]}: {len(members)} image member(s)")
+    for path, size in members:
+        print(f"   {split_member_path(path)[1]} ({size / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
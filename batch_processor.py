@@ -1,60 +1,509 @@
 import os
+import re
+import csv
 import glob
 import json
 import time
-from datetime import datetime
-from fiber_detector import FiberLengthDetector
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from fiber_detector import FiberLengthDetector, InferenceCancelled
+from concurrency_controller import AdaptiveConcurrencyLimiter
+from video_ingest import VIDEO_EXTENSIONS
+from archive_ingest import (ARCHIVE_EXTENSIONS, is_archive, list_archive_images, iter_member_bytes,
+                            split_member_path, path_exists, display_name)
+from profiling import RunProfiler, profiling_requested, memory_interval_from_env
+from results_store import ResultsStore, DEFAULT_STORE, records_from_output
+
+# Supported image formats
+IMAGE_EXTENSIONS = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tiff', '*.gif']
+VIDEO_SUFFIXES = tuple(ext[1:] for ext in VIDEO_EXTENSIONS)
+
+def find_image_files(input_dir, extensions=IMAGE_EXTENSIONS):
+    """Return the sorted list of supported image files in a directory"""
+    image_files = []
+    
+    for ext in extensions:
+        pattern = os.path.join(input_dir, ext)
+        image_files.extend(glob.glob(pattern, recursive=False))
+        # Also check uppercase
+        pattern_upper = os.path.join(input_dir, ext.upper())
+        image_files.extend(glob.glob(pattern_upper, recursive=False))
+    
+    # Remove duplicates and sort
+    return sorted(list(set(image_files)))
+
+def find_archive_images(input_path, extensions=IMAGE_EXTENSIONS):
+    """
+    Return "archive!member" paths of the images inside zip/tar archives
+    
+    input_path is either one archive or a directory whose archives are listed.
+    Members keep their archive order so each archive can be streamed in one pass.
+    """
+    if os.path.isfile(input_path):
+        archives = [input_path] if is_archive(input_path) else []
+    else:
+        archives = find_image_files(input_path, ARCHIVE_EXTENSIONS)
+    
+    members = []
+    for archive_path in archives:
+        try:
+            members.extend(path for path, _ in list_archive_images(archive_path, extensions))
+        except Exception as e:
+            print(f"⚠️  Could not read archive {os.path.basename(archive_path)}: {e}")
+    return members
+
+def parse_deadline(text, now=None):
+    """
+    Parse a run deadline typed at the prompt
+    
+    Accepts a wall-clock time ("06:30", the next occurrence of that time) or a
+    number of minutes from now ("90"). Returns a datetime or None for blank input.
+    """
+    text = text.strip()
+    if not text:
+        return None
+    now = now or datetime.now()
+    
+    if ':' in text:
+        clock = datetime.strptime(text, '%H:%M')
+        deadline = now.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+        if deadline <= now:
+            deadline += timedelta(days=1)
+        return deadline
+    
+    return now + timedelta(minutes=float(text))
 
 class BatchFiberProcessor:
-    def __init__(self, model_name="llava-phi3"):
+    def __init__(self, model_name="llava-phi3", config_path=None, initial_concurrency=2, max_concurrency=16,
+                 vote_k=None, profile=None, memory_interval=None, quality_gate=False, results_store=DEFAULT_STORE):
         print("🚀 Initializing Batch Fiber Processor...")
-        self.detector = FiberLengthDetector(model_name)
+        # Every run's readings are also added to this SQLite store (None disables it)
+        self.results_store = results_store
+        # Opt-in profiling; defaults come from FIBER_PROFILE / FIBER_PROFILE_MEMORY_INTERVAL
+        self.profile = profiling_requested() if profile is None else profile
+        self.memory_interval = memory_interval if memory_interval is not None else memory_interval_from_env()
+        if config_path:
+            print(f"⚙️  Loading detector config: {config_path}")
+            self.detector = FiberLengthDetector.from_config(config_path, priority='batch')
+        else:
+            self.detector = FiberLengthDetector(model_name, priority='batch')
+        if vote_k:
+            print(f"🗳️  Self-consistency voting: stop when {vote_k} samples agree")
+            self.detector.vote_k = vote_k
+            self.detector.vote_max_samples = max(vote_k, self.detector.vote_max_samples)
+        if quality_gate:
+            self.set_quality_gate(quality_gate)
         
-    def process_directory(self, input_dir, output_file="batch_results.json"):
-        """Process all images in a directory"""
-        print(f"\n📁 Scanning directory: {input_dir}")
+        # Learned in-flight limit; kept across runs against the same server/model
+        self.concurrency = AdaptiveConcurrencyLimiter(initial_limit=initial_concurrency,
+                                                      max_limit=max_concurrency)
+    
+    def set_quality_gate(self, quality_gate):
+        """
+        Turn the pre-inference quality gate on or off (it is off unless asked for)
+        
+        Args:
+            quality_gate: True (default thresholds, or the detector config's gate),
+                          a dict of thresholds, or False to turn it off
+        """
+        if not quality_gate:
+            self.detector.quality_gate = None
+            return
+        if self.detector.quality_gate is not None and not isinstance(quality_gate, dict):
+            return
+        # Blank, black and blurred photos are rejected before they cost a model call
+        try:
+            from quality_gate import QualityGate
+            settings = quality_gate if isinstance(quality_gate, dict) else {}
+            self.detector.quality_gate = QualityGate.from_settings(settings)
+            print("🚦 Quality gate enabled: blurred, dark, blank images are skipped")
+        except ImportError:
+            print("⚠️  Quality gate disabled (needs numpy and opencv-python)")
+    
+    def _start_profiler(self, output_dir, output_file):
+        """Start a RunProfiler writing next to output_file when profiling is enabled"""
+        if not self.profile:
+            return None
+        run_name = os.path.splitext(output_file)[0]
+        print(f"🔬 Profiling enabled (memory snapshots: "
+              f"{f'every {self.memory_interval}s' if self.memory_interval else 'off'})")
+        return RunProfiler(output_dir, run_name, memory_interval=self.memory_interval).start()
+    
+    def _record_results(self, results, **run):
+        """Add a run's readings to the results store; a store problem never fails the run"""
+        if not self.results_store:
+            return
+        try:
+            store = ResultsStore(self.results_store)
+            try:
+                added = store.record_run(results, **run)
+            finally:
+                store.close()
+            print(f"🗄️  Results store: {added} new reading(s) in {self.results_store}")
+        except Exception as e:
+            print(f"⚠️  Could not update results store {self.results_store}: {e}")
+    
+    def _stop_profiler(self, profiler):
+        if profiler is None:
+            return None
+        reports = profiler.stop()
+        for name, path in reports.items():
+            print(f"🔬 {name.replace('_', ' ').capitalize()}: {path}")
+        return reports
+    
+    def _dispatch(self, items, func=None, should_stop=None):
+        """
+        Run func over items under the adaptive concurrency limit
+        
+        The limiter counts requests, not items: every request the detector sends
+        (each vote sample and video keyframe included) holds a slot while it
+        runs and feeds its own latency back. At most limit items are in progress
+        at once, and each runs inside the detector's image_time_limit, which
+        gives all of an item's requests image_timeout seconds together. Yields
+        (item, result, seconds) in completion order. Once should_stop() returns
+        True no further items are submitted; work already in flight still
+        finishes (or is cut short by the detector's deadline).
+        """
+        func = func or self.detector.process_image
+        
+        def timed_call(item):
+            call_start = time.time()
+            try:
+                with self.detector.image_time_limit():
+                    result = func(item)
+            except Exception as e:
+                result = {'error': str(e)}
+                if isinstance(e, InferenceCancelled):
+                    result['cancelled'] = True
+            return result, time.time() - call_start
+        
+        pending = set()
+        futures = {}
+        self.detector.concurrency = self.concurrency
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency.max_limit) as executor:
+                for item in items:
+                    # Keep about one item per request slot, yielding finished work meanwhile
+                    while len(pending) >= self.concurrency.limit:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield (futures.pop(future),) + future.result()
+                    
+                    if should_stop and should_stop():
+                        break
+                    
+                    future = executor.submit(timed_call, item)
+                    futures[future] = item
+                    pending.add(future)
+                
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield (futures.pop(future),) + future.result()
+        finally:
+            self.detector.concurrency = None
+    
+    def _start_limits(self, start_time, deadline=None, max_inferences=None, image_timeout=None):
+        """Arm the detector with the run's deadline, inference budget and per-image time limit"""
+        if isinstance(deadline, datetime):
+            deadline = deadline.timestamp()
+        elif deadline is not None:
+            deadline = start_time + deadline  # seconds from now
+        
+        limits = {
+            'deadline': deadline,
+            'max_inferences': max_inferences,
+            'image_timeout': image_timeout,
+            'requests_before': self.detector.chat_requests - self.detector.coalesced_requests,
+        }
+        self.detector.deadline = deadline
+        self.detector.max_calls = limits['requests_before'] + max_inferences if max_inferences is not None else None
+        self.detector.image_timeout = image_timeout
+        return limits
+    
+    def _limits_reached(self, limits):
+        """Return why no more work should be started ('deadline' / 'budget'), or None"""
+        if limits['deadline'] is not None and time.time() >= limits['deadline']:
+            return 'deadline'
+        if self.detector.max_calls is not None and \
+                self.detector.chat_requests - self.detector.coalesced_requests >= self.detector.max_calls:
+            return 'budget'
+        return None
+    
+    def _stop_limits(self, limits):
+        """Disarm the detector and describe how the run's limits played out"""
+        self.detector.deadline = None
+        self.detector.max_calls = None
+        self.detector.image_timeout = None
+        
+        return {
+            'deadline': datetime.fromtimestamp(limits['deadline']).isoformat() if limits['deadline'] else None,
+            'max_inferences': limits['max_inferences'],
+            'inferences_used': self.detector.chat_requests - self.detector.coalesced_requests - limits['requests_before'],
+            'image_timeout_seconds': limits['image_timeout'],
+        }
+    
+    @staticmethod
+    def _order_for_limits(image_files):
+        """
+        Smallest files first: they are the cheapest to read, so more of them fit a deadline or budget
+        
+        Archive members follow in archive order, so each archive is still read in one pass.
+        """
+        def size(path):
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                return 0
+        files = [path for path in image_files if split_member_path(path)[1] is None]
+        members = [path for path in image_files if split_member_path(path)[1] is not None]
+        return sorted(files, key=lambda path: (size(path), path)) + members
+    
+    def process_directory(self, input_dir, output_file="batch_results.json", tiled=False,
+                          deadline=None, max_inferences=None, image_timeout=None, resume_from=None):
+        """
+        Process all images in a directory
+        
+        Images inside zip/tar archives in the directory are read straight from
+        the archive (input_dir may also be a single archive) and reported as
+        "archive!member" paths.
+        
+        With tiled=True every frame of multi-page TIFF/GIF files is processed and
+        frames larger than tiling.DEFAULT_MAX_SIDE are split into overlapping
+        tiles; the output then has one result per page listing every reading.
+        
+        Args:
+            deadline: datetime, or seconds from now, after which no new work starts
+                      and in-flight requests are cancelled
+            max_inferences: Most model requests this run may send
+            image_timeout: Seconds each file (each tile in tiled runs) may take in total,
+                           vote samples and video keyframes included; a file that runs
+                           over fails with an "Image timeout" error
+            resume_from: Summary JSON of an earlier run; only its unprocessed_files are
+                         processed and its finished results are carried over
+        
+        Files not finished when a limit is hit are left out of the results and
+        listed under "unprocessed_files" in the summary.
+        """
+        carried_results = []
+        if resume_from:
+            print(f"\n♻️  Resuming unprocessed files from: {resume_from}")
+            with open(resume_from) as f:
+                previous = json.load(f)
+            image_files = [path for path in previous.get('unprocessed_files', []) if path_exists(path)]
+            carried_results = [r for r in previous.get('results', []) if r.get('filepath') not in image_files]
+        elif os.path.isfile(input_dir):
+            print(f"\n📦 Scanning archive: {input_dir}")
+            image_files = find_archive_images(input_dir)
+        else:
+            print(f"\n📁 Scanning directory: {input_dir}")
+            image_files = find_image_files(input_dir)
+            if not tiled:
+                # Video clips are read through a few keyframes each
+                image_files = sorted(image_files + find_image_files(input_dir, VIDEO_EXTENSIONS))
+            image_files += find_archive_images(input_dir)
         
-        # Supported image formats
-        extensions = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tiff', '*.gif']
-        image_files = []
+        # Results of a single archive are written next to it
+        output_dir = input_dir if os.path.isdir(input_dir) else (os.path.dirname(input_dir) or '.')
         
-        for ext in extensions:
-            pattern = os.path.join(input_dir, ext)
-            image_files.extend(glob.glob(pattern, recursive=False))
-            # Also check uppercase
-            pattern_upper = os.path.join(input_dir, ext.upper())
-            image_files.extend(glob.glob(pattern_upper, recursive=False))
+        limited = deadline is not None or max_inferences is not None
+        if limited:
+            image_files = self._order_for_limits(image_files)
         
         if not image_files:
             print(f"❌ No image files found in {input_dir}")
-            print(f"   Supported formats: {', '.join(extensions)}")
+            print(f"   Supported formats: {', '.join(IMAGE_EXTENSIONS + ([] if tiled else VIDEO_EXTENSIONS))} "
+                  f"(also inside {', '.join(ARCHIVE_EXTENSIONS)})")
             return
         
-        # Remove duplicates and sort
-        image_files = sorted(list(set(image_files)))
-        
         print(f"✅ Found {len(image_files)} image files")
         for i, img in enumerate(image_files, 1):
-            print(f"   {i}. {os.path.basename(img)}")
+            print(f"   {i}. {display_name(img)}")
         
-        results = []
-        total_files = len(image_files)
+        total_files = len(image_files) + len(set(r['filepath'] for r in carried_results))
         start_time = time.time()
+        self.concurrency.reset_history()
+        if self.detector.quality_gate is not None:
+            self.detector.quality_gate.reset()
+        profiler = self._start_profiler(output_dir, output_file)
+        limits = self._start_limits(start_time, deadline, max_inferences, image_timeout)
         
-        print(f"\n🔄 Starting batch processing...")
+        print(f"\n🔄 Starting batch processing (adaptive concurrency, starting at {self.concurrency.limit})...")
+        if limited:
+            if limits['deadline'] is not None:
+                print(f"⏰ Deadline: {datetime.fromtimestamp(limits['deadline']).strftime('%Y-%m-%d %H:%M:%S')}")
+            if max_inferences is not None:
+                print(f"🎫 Inference budget: {max_inferences} model requests")
+            print("   Smallest files first; unfinished files are listed for the next run")
         print("=" * 60)
         
-        for i, image_path in enumerate(image_files, 1):
-            print(f"\n[{i}/{total_files}] Processing: {os.path.basename(image_path)}")
+        stop_reason = []
+        
+        def should_stop():
+            reason = self._limits_reached(limits)
+            if reason and not stop_reason:
+                stop_reason.append(reason)
+                print(f"\n⏹️  {'Deadline reached' if reason == 'deadline' else 'Inference budget used up'} - "
+                      f"no new work will be started")
+            return reason is not None
+        
+        try:
+            if tiled:
+                results = self._process_tiled(image_files, start_time, should_stop)
+            else:
+                results = self._process_files(image_files, start_time, should_stop)
+        finally:
+            # Read before _stop_limits disarms the detector's budget
+            final_reason = self._limits_reached(limits)
+            limits_summary = self._stop_limits(limits)
+        
+        # Only files with every page finished count; the rest go to the next run
+        cancelled_files = set(r['filepath'] for r in results if r.get('cancelled'))
+        pages_done = {}
+        for r in results:
+            pages_done[r['filepath']] = pages_done.get(r['filepath'], 0) + 1
+        finished_files = set(
+            r['filepath'] for r in results
+            if r['filepath'] not in cancelled_files and pages_done[r['filepath']] >= max(1, r.get('frame_count', 1))
+        )
+        results = [r for r in results if r['filepath'] in finished_files]
+        unprocessed_files = [path for path in image_files if path not in finished_files]
+        results += carried_results
+        finished_files.update(r['filepath'] for r in carried_results)
+        if unprocessed_files and not stop_reason:
+            stop_reason.append(final_reason or ('deadline' if limits['deadline'] is not None else 'budget'))
+        limits_summary['stopped_early'] = stop_reason[0] if stop_reason else None
+        
+        # Completion order depends on timing; keep the output stable
+        results.sort(key=lambda r: (r['filepath'], r.get('frame', 0)))
+        failed_files = set(r['filepath'] for r in results if 'error' in r)
+        successful_files = finished_files - failed_files
+        concurrency_summary = self.concurrency.summary()
+        quality_summary = self._quality_summary(results)
+        profiling_reports = self._stop_profiler(profiler)
+        
+        # Save results to JSON file
+        output_path = os.path.join(output_dir, output_file)
+        
+        summary = {
+            "processing_summary": {
+                "total_files": total_files,
+                "successfully_processed": len(successful_files),
+                "failed_files": len(failed_files),
+                "unprocessed_files": len(unprocessed_files),
+                "total_processing_time_seconds": round(time.time() - start_time, 2),
+                "average_time_per_file": round((time.time() - start_time) / total_files, 2),
+                "processed_at": datetime.now().isoformat(),
+                "input_directory": input_dir,
+                "resumed_from": resume_from
+            },
+            "concurrency": concurrency_summary,
+            "payload_cache": self.detector.payload_cache.stats(),
+            "request_coalescing": self.detector.coalescing_stats(),
+            "quality_gate": quality_summary,
+            "profiling": profiling_reports,
+            "run_limits": limits_summary,
+            "unprocessed_files": unprocessed_files,
+            "results": results
+        }
+        
+        try:
+            with open(output_path, 'w') as f:
+                json.dump(summary, f, indent=2)
             
-            file_start_time = time.time()
-            result = self.detector.process_image(image_path)
-            file_end_time = time.time()
+            print(f"\n{'='*60}")
+            print("📊 BATCH PROCESSING COMPLETE!")
+            print(f"{'='*60}")
+            print(f"✅ Successfully processed: {len(successful_files)}/{total_files} files")
+            if failed_files:
+                print(f"💥 Failed: {len(failed_files)} files")
+            print(f"⏱️  Total time: {(time.time() - start_time)/60:.1f} minutes")
+            print(f"🎚️  Concurrency limit: {concurrency_summary['min_limit_seen']}-{concurrency_summary['max_limit_seen']} "
+                  f"(mean {concurrency_summary['mean_limit']}, final {concurrency_summary['final_limit']})")
+            print(f"💾 Results saved to: {output_path}")
+            self._record_results(results, kind='tiled' if tiled else 'batch', source=os.path.abspath(output_path),
+                                 input_path=input_dir, summary=summary['processing_summary'])
+            if quality_summary and quality_summary['skipped']:
+                reasons = ', '.join(f"{reason}: {count}" for reason, count in quality_summary['reasons'].items())
+                saved = quality_summary['estimated_seconds_saved']
+                saved_text = f"saving ~{saved:.0f}s of inference" if saved is not None else "time saved unknown"
+                print(f"🚦 Skipped {quality_summary['skipped']} low-quality image(s) ({reasons}), {saved_text}")
+            if unprocessed_files:
+                reason = 'deadline reached' if limits_summary['stopped_early'] == 'deadline' else 'inference budget used up'
+                print(f"⏹️  Stopped early ({reason}): {len(unprocessed_files)} file(s) left for the next run")
+                print(f"   Resume with process_directory(..., resume_from={output_path!r})")
+            
+            # Show summary of detections
+            detected_count = sum(1 for r in results if r.get('detected_length'))
+            print(f"🔍 Measurements detected in: {detected_count}/{len(results)} files")
+            
+            if detected_count > 0:
+                print(f"\n📏 Detected measurements:")
+                for result in results:
+                    if result.get('detected_length'):
+                        length = result.get('detected_length')
+                        unit = result.get('unit', '')
+                        confidence = result.get('confidence', 0)
+                        filename = result.get('filename', 'Unknown')
+                        print(f"   • {filename}: {length} {unit} ({confidence}% confidence)")
+            
+        except Exception as e:
+            print(f"❌ Error saving results: {e}")
+    
+    def _quality_summary(self, results):
+        """Quality gate counts plus the inference time the skipped images would have cost"""
+        if self.detector.quality_gate is None:
+            return None
+        summary = self.detector.quality_gate.stats()
+        
+        # Estimated from the images of this run that did reach the model, else from the
+        # fastest request latency seen; unknown (None) when nothing was sent at all
+        inferred = [r['processing_time_seconds'] for r in results
+                    if 'processing_time_seconds' in r and not r.get('skipped') and 'error' not in r]
+        if inferred:
+            average = sum(inferred) / len(inferred)
+        else:
+            average = self.concurrency.summary()['baseline_latency_seconds']
+        summary['average_inference_seconds'] = round(average, 2) if average is not None else None
+        summary['estimated_seconds_saved'] = round(average * summary['skipped'], 2) if average is not None else None
+        return summary
+    
+    def _process_files(self, image_files, start_time, should_stop=None):
+        """Dispatch whole image files concurrently, one result per file"""
+        results = []
+        # Archive members streamed ahead of dispatch: {member path: (bytes, error)}
+        member_data = {}
+        
+        def iter_items():
+            members = [path for path in image_files if split_member_path(path)[1] is not None]
+            yield from (path for path in image_files if split_member_path(path)[1] is None)
+            # Pulled one at a time as slots free up, so only in-flight members are held in memory
+            for path, data, error in iter_member_bytes(members):
+                member_data[path] = (data, error)
+                yield path
+        
+        def process_file(path):
+            if path in member_data:
+                data, error = member_data.pop(path)
+                if error is not None:
+                    raise Exception(f"Failed to read archive member: {error}")
+                return self.detector.process_image(path, data)
+            if os.path.splitext(path)[1].lower() in VIDEO_SUFFIXES:
+                return self.detector.process_video(path)
+            return self.detector.process_image(path)
+        
+        for i, (image_path, result, processing_time) in enumerate(self._dispatch(iter_items(), process_file, should_stop), 1):
+            print(f"\n[{i}/{len(image_files)}] Processed: {display_name(image_path)}")
             
-            processing_time = file_end_time - file_start_time
+            if result and result.get('cancelled'):
+                result['filepath'] = image_path
+                results.append(result)
+                print(f"   ⏹️  Cancelled: {result.get('error')}")
+                continue
             
             if result:
-                result['filename'] = os.path.basename(image_path)
+                result['filename'] = display_name(image_path)
                 result['filepath'] = image_path
                 result['processed_at'] = datetime.now().isoformat()
                 result['processing_time_seconds'] = round(processing_time, 2)
@@ -65,36 +514,189 @@ class BatchFiberProcessor:
                 unit = result.get('unit', '')
                 confidence = result.get('confidence', 0)
                 
-                if length:
+                if result.get('skipped'):
+                    print(f"   🚦 Skipped by quality gate: {result['skipped']}")
+                elif length:
                     print(f"   ✅ Found: {length} {unit} (confidence: {confidence}%)")
                 else:
                     print(f"   ❌ No measurement detected")
             else:
                 print(f"   💥 Failed to process")
             
-            print(f"   ⏱️  Processing time: {processing_time:.1f}s")
+            print(f"   ⏱️  Processing time: {processing_time:.1f}s (concurrency limit: {self.concurrency.limit})")
             
             # Estimate remaining time
-            if i < total_files:
+            if i < len(image_files):
                 avg_time = (time.time() - start_time) / i
-                remaining_time = avg_time * (total_files - i)
+                remaining_time = avg_time * (len(image_files) - i)
                 mins, secs = divmod(remaining_time, 60)
                 print(f"   🕐 Estimated remaining: {int(mins)}m {int(secs)}s")
         
-        # Save results to JSON file
+        return results
+    
+    def _process_tiled(self, image_files, start_time, should_stop=None):
+        """Dispatch every tile of every frame concurrently and merge them into one result per page"""
+        from tiling import iter_tile_jobs, merge_tile_results
+        
+        def run_tile(job):
+            if 'error' in job:
+                return {'detected_length': None, 'error': job['error']}
+            payload = job['payload'] or self.detector.payload_cache.get(job['filepath'])
+            tile_name = f"{display_name(job['filepath'])} [frame {job['frame']}, tile {job['tile_index'] + 1}/{job['tile_count']}]"
+            try:
+                return self.detector._extract_number(payload, tile_name)
+            finally:
+                job['payload'] = None  # release the encoded tile as soon as it has been sent
+        
+        pages = {}
+        results = []
+        
+        for job, result, seconds in self._dispatch(iter_tile_jobs(image_files), run_tile, should_stop):
+            job['result'] = result
+            job['seconds'] = seconds
+            key = (job['filepath'], job['frame'])
+            page_jobs = pages.setdefault(key, [])
+            page_jobs.append(job)
+            
+            if len(page_jobs) < job['tile_count']:
+                continue
+            
+            # All tiles of this page are back
+            del pages[key]
+            page = merge_tile_results(page_jobs)
+            page['filename'] = display_name(job['filepath'])
+            page['filepath'] = job['filepath']
+            page['model_used'] = self.detector.model_name
+            page['processed_at'] = datetime.now().isoformat()
+            page['processing_time_seconds'] = round(sum(j['seconds'] for j in page_jobs), 2)
+            if any(j['result'].get('cancelled') for j in page_jobs):
+                page['cancelled'] = True
+            results.append(page)
+            
+            frame_text = f" (frame {page['frame'] + 1}/{page['frame_count']})" if page['frame_count'] > 1 else ""
+            print(f"\n📄 {page['filename']}{frame_text}: {page['tiles']} tile(s)")
+            if page['readings']:
+                for reading in page['readings']:
+                    print(f"   ✅ {reading['value']} {reading['unit']} at {reading['box']} "
+                          f"(confidence: {reading['confidence']}%)")
+            elif 'error' in page:
+                print(f"   💥 Failed to process: {page['error']}")
+            else:
+                print(f"   ❌ No measurement detected")
+            print(f"   ⏱️  Elapsed: {time.time() - start_time:.1f}s (concurrency limit: {self.concurrency.limit})")
+        
+        return results
+    
+    def process_pairs(self, input_dir, pairing="pattern", output_file="pair_results.json",
+                      before_tag="before", after_tag="after"):
+        """
+        Compare many before/after image pairs, inferring each unique image once
+        
+        Args:
+            input_dir: Directory containing the images
+            pairing: Path to a CSV of pairs, "pattern" (e.g. reel1_before/reel1_after)
+                     or "series" (consecutive images of the same series)
+            output_file: JSON file written into input_dir
+            before_tag: Filename tag marking the "before" image in pattern mode
+            after_tag: Filename tag marking the "after" image in pattern mode
+        """
+        print(f"\n📁 Scanning directory: {input_dir}")
+        image_files = find_image_files(input_dir)
+        
+        if pairing.lower().endswith('.csv'):
+            print(f"📄 Reading pairs from: {pairing}")
+            pairs = self._pairs_from_csv(pairing, input_dir)
+        elif pairing == "pattern":
+            print(f"🔗 Pairing by filename pattern: *{before_tag}* / *{after_tag}*")
+            pairs = self._pairs_from_pattern(image_files, before_tag, after_tag)
+        elif pairing == "series":
+            print("🔗 Pairing consecutive images in each series")
+            pairs = self._pairs_from_series(image_files)
+        else:
+            print(f"❌ Unknown pairing spec: {pairing}")
+            print("   Use a .csv file, 'pattern' or 'series'")
+            return
+        
+        if not pairs:
+            print(f"❌ No image pairs found in {input_dir}")
+            return
+        
+        # Every image is inferred exactly once, even if it appears in several pairs
+        unique_images = list(OrderedDict.fromkeys(
+            path for pair in pairs for path in (pair['before'], pair['after'])
+        ))
+        
+        print(f"✅ Found {len(pairs)} pairs covering {len(unique_images)} unique images")
+        
+        start_time = time.time()
+        self.concurrency.reset_history()
+        profiler = self._start_profiler(input_dir, output_file)
+        
+        print(f"\n🔄 Running inference (adaptive concurrency, starting at {self.concurrency.limit})...")
+        print("=" * 60)
+        
+        image_results = self._infer_images(unique_images)
+        
+        print(f"\n🔄 Computing differences...")
+        print("=" * 60)
+        
+        comparisons = []
+        running_totals = {}
+        
+        for pair in pairs:
+            result1 = image_results.get(pair['before'])
+            result2 = image_results.get(pair['after'])
+            difference = self.detector.calculate_difference(result1, result2)
+            
+            series = pair['series']
+            series_total = running_totals.setdefault(series, {'pairs': 0, 'measured_pairs': 0, 'total_difference': 0.0})
+            series_total['pairs'] += 1
+            if difference is not None:
+                series_total['measured_pairs'] += 1
+                series_total['total_difference'] += difference
+            
+            comparisons.append({
+                'series': series,
+                'image1_path': pair['before'],
+                'image2_path': pair['after'],
+                'image1_length': result1.get('detected_length') if result1 else None,
+                'image2_length': result2.get('detected_length') if result2 else None,
+                'difference': difference,
+                'difference_unit': 'meters' if difference is not None else 'N/A',
+                'running_total': round(series_total['total_difference'], 3),
+                'method': 'Batch Pair Analysis'
+            })
+            
+            name1 = os.path.basename(pair['before'])
+            name2 = os.path.basename(pair['after'])
+            if difference is not None:
+                print(f"   ✅ [{series}] {name1} → {name2}: {difference} meters "
+                      f"(running total: {series_total['total_difference']:.3f})")
+            else:
+                print(f"   ❌ [{series}] {name1} → {name2}: could not calculate difference")
+        
+        for series_total in running_totals.values():
+            series_total['total_difference'] = round(series_total['total_difference'], 3)
+        
+        profiling_reports = self._stop_profiler(profiler)
         output_path = os.path.join(input_dir, output_file)
+        total_time = time.time() - start_time
         
         summary = {
             "processing_summary": {
-                "total_files": total_files,
-                "successfully_processed": len(results),
-                "failed_files": total_files - len(results),
-                "total_processing_time_seconds": round(time.time() - start_time, 2),
-                "average_time_per_file": round((time.time() - start_time) / total_files, 2),
+                "total_pairs": len(pairs),
+                "unique_images": len(unique_images),
+                "measured_pairs": sum(1 for c in comparisons if c['difference'] is not None),
+                "pairing": pairing,
+                "total_processing_time_seconds": round(total_time, 2),
                 "processed_at": datetime.now().isoformat(),
                 "input_directory": input_dir
             },
-            "results": results
+            "concurrency": self.concurrency.summary(),
+            "profiling": profiling_reports,
+            "series_totals": running_totals,
+            "comparisons": comparisons,
+            "image_results": image_results
         }
         
         try:
@@ -102,28 +704,111 @@ class BatchFiberProcessor:
                 json.dump(summary, f, indent=2)
             
             print(f"\n{'='*60}")
-            print("📊 BATCH PROCESSING COMPLETE!")
+            print("📊 PAIR PROCESSING COMPLETE!")
             print(f"{'='*60}")
-            print(f"✅ Successfully processed: {len(results)}/{total_files} files")
-            print(f"⏱️  Total time: {(time.time() - start_time)/60:.1f} minutes")
+            print(f"✅ Compared {len(pairs)} pairs using {len(unique_images)} inferences")
+            print(f"⏱️  Total time: {total_time/60:.1f} minutes")
             print(f"💾 Results saved to: {output_path}")
+            self._record_results(records_from_output(summary)[0], kind='pairs', source=os.path.abspath(output_path),
+                                 input_path=input_dir, summary=summary['processing_summary'],
+                                 default_time=summary['processing_summary']['processed_at'])
             
-            # Show summary of detections
-            detected_count = sum(1 for r in results if r.get('detected_length'))
-            print(f"🔍 Measurements detected in: {detected_count}/{len(results)} files")
-            
-            if detected_count > 0:
-                print(f"\n📏 Detected measurements:")
-                for result in results:
-                    if result.get('detected_length'):
-                        length = result.get('detected_length')
-                        unit = result.get('unit', '')
-                        confidence = result.get('confidence', 0)
-                        filename = result.get('filename', 'Unknown')
-                        print(f"   • {filename}: {length} {unit} ({confidence}% confidence)")
+            print(f"\n📏 Series totals:")
+            for series, series_total in running_totals.items():
+                print(f"   • {series}: {series_total['total_difference']} meters "
+                      f"over {series_total['measured_pairs']}/{series_total['pairs']} pairs")
             
         except Exception as e:
             print(f"❌ Error saving results: {e}")
+        
+        return summary
+    
+    def _infer_images(self, image_paths):
+        """Run the detector over image_paths concurrently, returning {path: result}"""
+        results = {}
+        total = len(image_paths)
+        
+        for i, (path, result, _) in enumerate(self._dispatch(image_paths), 1):
+            results[path] = result
+            
+            length = result.get('detected_length')
+            if length is not None and length != 'Not detected':
+                print(f"   [{i}/{total}] ✅ {os.path.basename(path)}: {length} {result.get('unit', '')}")
+            else:
+                print(f"   [{i}/{total}] ❌ {os.path.basename(path)}: no measurement detected")
+        
+        # Keep the input order for stable output
+        return {path: results[path] for path in image_paths}
+    
+    def _pairs_from_csv(self, csv_path, input_dir):
+        """
+        Read pairs from a CSV with before,after[,series] columns
+        
+        A header row is optional. Relative paths are resolved against input_dir.
+        """
+        pairs = []
+        
+        with open(csv_path, newline='') as f:
+            for row in csv.reader(f):
+                row = [cell.strip() for cell in row]
+                if len(row) < 2 or not row[0] or row[0].startswith('#'):
+                    continue
+                if row[0].lower() == 'before' and row[1].lower() == 'after':
+                    continue
+                
+                before, after = (p if os.path.isabs(p) else os.path.join(input_dir, p) for p in row[:2])
+                series = row[2] if len(row) > 2 and row[2] else self._series_key(before)
+                pairs.append({'before': before, 'after': after, 'series': series})
+        
+        return pairs
+    
+    def _pairs_from_pattern(self, image_files, before_tag="before", after_tag="after"):
+        """Pair files like reelX_before.jpg with reelX_after.jpg"""
+        by_name = {os.path.basename(path).lower(): path for path in image_files}
+        pairs = []
+        
+        for path in image_files:
+            name = os.path.basename(path)
+            if before_tag.lower() not in name.lower():
+                continue
+            
+            partner_name = re.sub(re.escape(before_tag), after_tag, name, flags=re.IGNORECASE)
+            partner = by_name.get(partner_name.lower())
+            if not partner:
+                print(f"   ⚠️  No '{after_tag}' image for {name}")
+                continue
+            
+            stem = os.path.splitext(name)[0]
+            series = re.sub(re.escape(before_tag), '', stem, flags=re.IGNORECASE).strip('_- .') or stem
+            pairs.append({'before': path, 'after': partner, 'series': series})
+        
+        return pairs
+    
+    def _pairs_from_series(self, image_files):
+        """Pair consecutive images within each series (reel4711_01, reel4711_02, ...)"""
+        series_files = OrderedDict()
+        for path in image_files:
+            series_files.setdefault(self._series_key(path), []).append(path)
+        
+        pairs = []
+        for series, paths in series_files.items():
+            paths = sorted(paths, key=self._natural_key)
+            for before, after in zip(paths, paths[1:]):
+                pairs.append({'before': before, 'after': after, 'series': series})
+        
+        return pairs
+    
+    @staticmethod
+    def _series_key(path):
+        """Series name of a file: its stem without a trailing sequence number"""
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return re.sub(r'[_\-\s]*\d+$', '', stem) or stem
+    
+    @staticmethod
+    def _natural_key(path):
+        """Sort key that orders cut_2 before cut_10"""
+        name = os.path.basename(path).lower()
+        return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
 
 def main():
     print("🚀 Batch Fiber Length Processor")
@@ -132,7 +817,7 @@ def main():
     processor = BatchFiberProcessor()
     
     while True:
-        print(f"\n📁 Enter directory path containing images:")
+        print(f"\n📁 Enter directory path containing images (or a zip/tar archive of images):")
         print("   (or 'quit' to exit)")
         
         input_directory = input("➤ ").strip().strip('"').strip("'")
@@ -149,28 +834,99 @@ def main():
             print(f"❌ Directory not found: {input_directory}")
             continue
         
-        if not os.path.isdir(input_directory):
-            print(f"❌ Path is not a directory: {input_directory}")
+        if not os.path.isdir(input_directory) and not is_archive(input_directory):
+            print(f"❌ Path is not a directory or zip/tar archive: {input_directory}")
             continue
         
+        # Ask for processing mode
+        print(f"\n🔀 Processing mode:")
+        print("   1. Single images (default)")
+        print("   2. Before/after pairs")
+        print("   3. Tiled (large scanned sheets, multi-page TIFF/GIF)")
+        mode = input("➤ ").strip()
+        
+        pairing = None
+        if mode == '2':
+            print(f"\n🔗 Enter pairing spec: path to a pairs CSV, 'pattern' or 'series' (default: pattern):")
+            pairing = input("➤ ").strip().strip('"').strip("'") or "pattern"
+            default_output = "pair_results.json"
+        else:
+            default_output = "batch_results.json"
+        
         # Ask for output filename
-        print(f"\n💾 Enter output filename (default: batch_results.json):")
+        print(f"\n💾 Enter output filename (default: {default_output}):")
         output_file = input("➤ ").strip()
         if not output_file:
-            output_file = "batch_results.json"
+            output_file = default_output
         
         # Ensure .json extension
         if not output_file.endswith('.json'):
             output_file += '.json'
         
+        # Run limits for single/tiled runs
+        deadline = max_inferences = image_timeout = resume_from = None
+        if not pairing:
+            output_dir = input_directory if os.path.isdir(input_directory) else (os.path.dirname(input_directory) or '.')
+            previous_path = os.path.join(output_dir, output_file)
+            try:
+                with open(previous_path) as f:
+                    left_over = len(json.load(f).get('unprocessed_files', []))
+            except (OSError, ValueError):
+                left_over = 0
+            if left_over:
+                answer = input(f"\n♻️  {output_file} lists {left_over} unprocessed file(s). Resume them? (y/n): ")
+                if answer.strip().lower() in ['y', 'yes']:
+                    resume_from = previous_path
+            
+            print(f"\n⏰ Deadline: clock time (e.g. 06:30) or minutes from now (blank = none):")
+            try:
+                deadline = parse_deadline(input("➤ "))
+            except ValueError:
+                print("⚠️  Could not read the deadline - running without one")
+            
+            print(f"\n🎫 Max model requests (blank = no limit):")
+            budget_text = input("➤ ").strip()
+            if budget_text.isdigit():
+                max_inferences = int(budget_text)
+            
+            print(f"\n⏳ Max seconds per {'tile' if mode == '3' else 'file'}, all of its model requests together (blank = no limit):")
+            timeout_text = input("➤ ").strip()
+            try:
+                image_timeout = float(timeout_text) if timeout_text else None
+            except ValueError:
+                print("⚠️  Could not read the time limit - running without one")
+        
+        print(f"\n🚦 Skip blurred, dark and blank images without asking the model? (y/N):")
+        skip_low_quality = input("➤ ").strip().lower() in ['y', 'yes']
+        
         # Confirm before starting
         print(f"\n📋 Processing Summary:")
         print(f"   Input Directory: {input_directory}")
+        if pairing:
+            print(f"   Pairing: {pairing}")
+        if mode == '3':
+            print(f"   Mode: Tiled")
         print(f"   Output File: {output_file}")
+        if resume_from:
+            print(f"   Resuming: unprocessed files of {output_file}")
+        if deadline:
+            print(f"   Deadline: {deadline.strftime('%Y-%m-%d %H:%M')}")
+        if max_inferences is not None:
+            print(f"   Max model requests: {max_inferences}")
+        if image_timeout is not None:
+            print(f"   Max seconds per {'tile' if mode == '3' else 'file'}: {image_timeout:g}")
+        if skip_low_quality:
+            print(f"   Quality gate: on")
         
         confirm = input("\nStart processing? (y/n): ").strip().lower()
         if confirm in ['y', 'yes']:
-            processor.process_directory(input_directory, output_file)
+            processor.set_quality_gate(skip_low_quality)
+            if pairing:
+                processor.process_pairs(input_directory, pairing, output_file)
+            else:
+                processor.process_directory(input_directory, output_file, tiled=(mode == '3'),
+                                            deadline=deadline, max_inferences=max_inferences,
+                                            image_timeout=image_timeout, resume_from=resume_from)
         else:
             print("❌ Processing cancelled")
 
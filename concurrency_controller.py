@@ -0,0 +1,152 @@
+import time
+import threading
+from collections import deque
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, initial_limit=2, min_limit=1, max_limit=16,
+                 latency_tolerance=1.5, backoff_ratio=0.5, latency_backoff_ratio=0.9,
+                 baseline_window=100, smoothing=0.2):
+        """
+        AIMD concurrency limit for requests to the Ollama server
+        
+        The limit grows by about one request per round trip while latency stays
+        near the no-load baseline. It shrinks gently (latency_backoff_ratio) when
+        latency climbs past latency_tolerance x baseline, i.e. Ollama is queueing
+        internally. It is cut hard (backoff_ratio) on errors and timeouts.
+        
+        Args:
+            initial_limit: Starting number of in-flight requests
+            min_limit: Lower bound for the limit
+            max_limit: Upper bound for the limit (and worker pool size)
+            latency_tolerance: Smoothed latency / baseline ratio treated as queueing
+            backoff_ratio: Multiplicative decrease on errors
+            latency_backoff_ratio: Multiplicative decrease on queueing latency
+            baseline_window: Number of recent successful latencies the baseline is taken from
+            smoothing: EWMA weight for the short-term latency
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.latency_backoff_ratio = latency_backoff_ratio
+        self.smoothing = smoothing
+        
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial_limit)))
+        self._in_flight = 0
+        self._recent_latencies = deque(maxlen=baseline_window)
+        self._smoothed_latency = None
+        self._completed_since_decrease = 0
+        self._condition = threading.Condition()
+        
+        self.reset_history()
+    
+    @property
+    def limit(self):
+        """Current whole-number concurrency limit"""
+        return int(self._limit)
+    
+    @property
+    def in_flight(self):
+        return self._in_flight
+    
+    def reset_history(self):
+        """Start a new reporting period (the learned limit is kept)"""
+        with self._condition:
+            self._start_time = time.time()
+            self._history = [(0.0, self.limit, 'start')]
+            self._completed = 0
+            self._errors = 0
+            self._peak_in_flight = 0
+    
+    def acquire(self):
+        """Block until a request slot is free under the current limit"""
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+    
+    def release(self, latency, failed=False):
+        """
+        Return a slot and feed the observation into the limit
+        
+        Args:
+            latency: Seconds the request took, or None when it never reached the server
+                     (e.g. cancelled by a deadline); the slot is returned without an observation
+            failed: True for errors and timeouts
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if latency is None and not failed:
+                # Nothing was sent, so there is nothing to learn from
+                self._condition.notify_all()
+                return
+            
+            self._completed += 1
+            self._completed_since_decrease += 1
+            
+            old_limit = self.limit
+            if failed:
+                self._errors += 1
+                self._decrease(self.backoff_ratio, 'error')
+            else:
+                self._recent_latencies.append(latency)
+                if self._smoothed_latency is None:
+                    self._smoothed_latency = latency
+                else:
+                    self._smoothed_latency += self.smoothing * (latency - self._smoothed_latency)
+                
+                baseline = min(self._recent_latencies)
+                if baseline > 0 and self._smoothed_latency > baseline * self.latency_tolerance:
+                    self._decrease(self.latency_backoff_ratio, 'latency')
+                else:
+                    # Additive increase: roughly +1 per full window of completions
+                    self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+                    if self.limit != old_limit:
+                        self._record('increase')
+            
+            self._condition.notify_all()
+    
+    def _decrease(self, ratio, reason):
+        # Only back off once per window of in-flight requests; the others were
+        # already dispatched under the old limit and report the same congestion
+        if self._completed_since_decrease < max(1, self.limit):
+            return
+        old_limit = self.limit
+        self._limit = max(self.min_limit, self._limit * ratio)
+        self._completed_since_decrease = 0
+        if reason == 'latency':
+            # Let the smoothed latency re-converge under the new limit
+            self._smoothed_latency = None
+        if self.limit != old_limit:
+            self._record(f'decrease ({reason})')
+    
+    def _record(self, event):
+        self._history.append((round(time.time() - self._start_time, 3), self.limit, event))
+    
+    def summary(self):
+        """Limit-over-time report for the run summary"""
+        with self._condition:
+            history = list(self._history)
+            elapsed = time.time() - self._start_time
+            
+            # Time-weighted mean of the limit over the run
+            weighted = 0.0
+            for (t0, limit, _), (t1, _, _) in zip(history, history[1:] + [(elapsed, None, None)]):
+                weighted += limit * max(0.0, t1 - t0)
+            
+            return {
+                'final_limit': self.limit,
+                'min_limit_seen': min(limit for _, limit, _ in history),
+                'max_limit_seen': max(limit for _, limit, _ in history),
+                'mean_limit': round(weighted / elapsed, 2) if elapsed > 0 else self.limit,
+                'peak_in_flight': self._peak_in_flight,
+                'completed_requests': self._completed,
+                'failed_requests': self._errors,
+                'baseline_latency_seconds': round(min(self._recent_latencies), 3) if self._recent_latencies else None,
+                'limit_history': [
+                    {'elapsed_seconds': t, 'limit': limit, 'event': event}
+                    for t, limit, event in history
+                ]
+            }
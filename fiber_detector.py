@@ -1,47 +1,214 @@
-import ollama
-import re
-import base64
-from PIL import Image
-import io
-import json
 import os
 import sys
+import json
+import time
+import hashlib
+import threading
+import contextvars
+import urllib.parse
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from image_payload import ImagePayloadCache, EncodedImage, build_chat_body
+from quality_gate import REASON_CODES
+from response_parser import parse_response, score_confidence
+
+DEFAULT_PROMPT = 'Extract the handwritten number in meters from this image.'
+
+# Paraphrases cycled through by voting samples so they don't all fail the same way
+VOTING_PROMPTS = [
+    DEFAULT_PROMPT,
+    'What length in meters is handwritten in this image? Answer with the number.',
+    'Read the handwritten measurement (in meters) on this cable label.',
+    'This image shows a handwritten fiber length. Which number is written, in meters?'
+]
+VOTING_TEMPERATURE = 0.7
+
+# Epoch seconds by which every request of the image being processed must be answered
+# (see FiberLengthDetector.image_time_limit); follows the image into vote/keyframe threads
+_image_deadline = contextvars.ContextVar('image_deadline', default=None)
+
+
+def ollama_base_url(host=None):
+    """
+    Server URL the way the ollama client resolves it: host, else OLLAMA_HOST, else 127.0.0.1:11434
+    
+    "example.com" -> "http://example.com:11434", "https://example.com" -> "https://example.com:443"
+    """
+    host = (host or os.environ.get('OLLAMA_HOST') or '').strip()
+    scheme, separator, rest = host.rpartition('://')
+    if separator:
+        default_port = 443 if scheme == 'https' else 80
+    else:
+        scheme, default_port = 'http', 11434
+    parsed = urllib.parse.urlsplit(f"{scheme}://{rest}")
+    hostname = parsed.hostname or '127.0.0.1'
+    if ':' in hostname:
+        hostname = f"[{hostname}]"  # IPv6
+    return f"{scheme}://{hostname}:{parsed.port or default_port}{parsed.path.rstrip('/')}"
+
+class InferenceCancelled(Exception):
+    """A request skipped or cut short by the run's deadline or inference budget"""
+
+
+class ImageTimeout(TimeoutError):
+    """An image's requests ran past its time limit (see FiberLengthDetector.image_time_limit)"""
+
+
+def carry_context(func):
+    """Wrap func to run in a copy of the caller's context, e.g. its per-image time limit, on pool threads"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
+
+
+def is_connection_error(error):
+    """
+    True when error, or an exception it was raised from, is a refused or dropped connection or a timeout
+    
+    Those say the Ollama server is down or overloaded, not that the image is bad.
+    """
+    httpx = sys.modules.get('httpx')
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (ConnectionError, TimeoutError)):
+            return True
+        if httpx is not None and isinstance(error, httpx.TransportError):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
 
 class FiberLengthDetector:
-    def __init__(self, model_name='llava-phi3'):
+    def __init__(self, model_name='llava-phi3', prompt=DEFAULT_PROMPT, host=None,
+                 priority='batch', scheduler=None, vote_k=None, vote_max_samples=7, timeout=None,
+                 quality_gate=None):
         """
         Initialize the Fiber Length Detector with Ollama model
+        
+        Args:
+            model_name: Ollama vision model to query
+            prompt: Extraction prompt sent with every image
+            host: Ollama server URL (None uses FIBER_SCHEDULER_URL, then the client default / OLLAMA_HOST)
+            priority: 'interactive' or 'batch' when requests go through a scheduler
+            scheduler: In-process PriorityRequestScheduler to submit requests through (give the
+                       same one to every detector of an app that embeds GUI and batch work)
+            vote_k: Enable self-consistency voting; stop once this many samples agree
+            vote_max_samples: Most samples spent on one image when voting
+            timeout: Seconds before a single Ollama request is abandoned (None = client default)
+            quality_gate: QualityGate that rejects unreadable images before process_image queries the model
         """
         self.model_name = model_name
+        self.prompt = prompt
+        self.priority = priority
+        self.scheduler = scheduler
+        self.vote_k = vote_k
+        self.vote_max_samples = max(vote_k or 1, vote_max_samples)
+        self.timeout = timeout
+        self.quality_gate = quality_gate
+        # Run limits set by BatchFiberProcessor: absolute deadline (epoch seconds), max sent
+        # requests, and seconds each image may take in total (see image_time_limit)
+        self.deadline = None
+        self.max_calls = None
+        self.image_timeout = None
+        # Batch AdaptiveConcurrencyLimiter: every request sent to Ollama (each vote sample
+        # and video keyframe included) holds one of its slots
+        self.concurrency = None
+        # Encoded payloads of recently used images (retries, dual mode, voting)
+        self.payload_cache = ImagePayloadCache()
+        # Single-flight: identical concurrent requests share one Ollama call
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.chat_requests = 0
+        self.coalesced_requests = 0
+        # A running request_scheduler.py broker takes over when no host is given
+        self.host = host or os.environ.get('FIBER_SCHEDULER_URL') or None
         try:
-            self.client = ollama.Client()
+            # Imported here so the CLI and GUI start without loading the ollama/httpx stack
+            import httpx
+            import ollama
+            from request_scheduler import PRIORITY_HEADER
+            self.client = ollama.Client(host=self.host, headers={PRIORITY_HEADER: priority}, timeout=timeout)
+            # Our own connection for pre-encoded request bodies (see _send_chat), so it
+            # doesn't depend on the ollama client's internals
+            headers = {'Content-Type': 'application/json', 'Accept': 'application/json', PRIORITY_HEADER: priority}
+            if os.environ.get('OLLAMA_API_KEY'):
+                headers['Authorization'] = f"Bearer {os.environ['OLLAMA_API_KEY']}"
+            self.http_client = httpx.Client(base_url=ollama_base_url(self.host), headers=headers,
+                                            timeout=timeout, follow_redirects=True)
             print(f"Connected to Ollama with model: {model_name}")
         except Exception as e:
             print(f"Error connecting to Ollama: {e}")
             raise Exception(f"Cannot connect to Ollama: {e}")
     
+    @classmethod
+    def from_config(cls, config_path, **overrides):
+        """
+        Create a detector from a saved JSON config (e.g. the one written by model_evaluator.py)
+        
+        Args:
+            config_path: Path to a JSON file with model_name, prompt and optionally host,
+                         voting/timeout settings and quality_gate thresholds
+            overrides: Keyword arguments that take precedence over the file
+        """
+        try:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+        except Exception as e:
+            raise Exception(f"Failed to load detector config: {str(e)}")
+        
+        kwargs = {
+            'model_name': config.get('model_name', 'llava-phi3'),
+            'prompt': config.get('prompt', DEFAULT_PROMPT),
+            'host': config.get('host')
+        }
+        for optional in ('vote_k', 'vote_max_samples', 'timeout'):
+            if optional in config:
+                kwargs[optional] = config[optional]
+        if config.get('quality_gate'):
+            from quality_gate import QualityGate
+            settings = config['quality_gate']
+            kwargs['quality_gate'] = QualityGate.from_settings(settings if isinstance(settings, dict) else {})
+        kwargs.update(overrides)
+        return cls(**kwargs)
+    
     
-    def process_image(self, image_path):
+    def process_image(self, image_path, image_data=None):
         """
         Process a single image to extract fiber length
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or an archive member ("bundle.zip!reel.jpg")
+            image_data: The image's bytes when the caller has already read them
             
         Returns:
             dict: Analysis results
         """
         try:
-            # Read and convert image to bytes
-            image_bytes = self._image_to_bytes(image_path)
+            if self.quality_gate is not None:
+                reason, metrics = self.quality_gate.check(image_path, image_data)
+                if reason:
+                    return {
+                        'detected_length': None,
+                        'unit': 'N/A',
+                        'confidence': 0,
+                        'method': 'Quality gate',
+                        'raw_text': f'Skipped: {REASON_CODES[reason]}',
+                        'additional_numbers': [],
+                        'skipped': reason,
+                        'quality': metrics
+                    }
+            
+            # Memory-mapped, base64-encoded once and cached
+            image_payload = self.payload_cache.get(image_path, image_data)
             
             # Extract number using Ollama model
-            result = self._extract_number_from_image_bytes(image_bytes, image_path)
+            result = self._extract_number(image_payload, image_path)
+            if image_payload.content_hash:
+                result['content_hash'] = image_payload.content_hash
             
             return result
             
         except Exception as e:
-            return {
+            result = {
                 'detected_length': 'Not detected',
                 'unit': 'N/A',
                 'confidence': 0,
@@ -50,6 +217,29 @@ class FiberLengthDetector:
                 'additional_numbers': [],
                 'error': str(e)
             }
+            if isinstance(e, InferenceCancelled):
+                result['cancelled'] = True
+            elif is_connection_error(e):
+                result['transient'] = True
+            return result
+    
+    def process_video(self, source, **selection_options):
+        """
+        Process a video file or camera stream of a drum label
+        
+        A few sharp, distinct keyframes are selected and read; their readings
+        are fused into one result (see video_ingest.process_video).
+        
+        Args:
+            source: Video file path or camera index
+            selection_options: Keyframe selection settings (max_keyframes, sample_fps, ...)
+            
+        Returns:
+            dict: Analysis results
+        """
+        # OpenCV is only loaded for video input
+        from video_ingest import process_video
+        return process_video(self, source, **selection_options)
     
     def process_two_images(self, image_path1, image_path2):
         """
@@ -67,13 +257,16 @@ class FiberLengthDetector:
             print(f"Image 1: {os.path.basename(image_path1)}")
             print(f"Image 2: {os.path.basename(image_path2)}")
             
-            # Process both images (like your Colab)
-            image1_bytes = self._image_to_bytes(image_path1)
-            image2_bytes = self._image_to_bytes(image_path2)
+            # Process both images (like your Colab); comparing an image with itself encodes it once
+            image1_payload = self.payload_cache.get(image_path1)
+            image2_payload = self.payload_cache.get(image_path2)
             
-            # Extract numbers from both images
-            num1 = self._extract_number_from_image_bytes(image1_bytes, image_path1)
-            num2 = self._extract_number_from_image_bytes(image2_bytes, image_path2)
+            # Extract numbers from both images concurrently; the same image twice shares one request
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                future1 = executor.submit(carry_context(self._extract_number), image1_payload, image_path1)
+                future2 = executor.submit(carry_context(self._extract_number), image2_payload, image_path2)
+                num1 = future1.result()
+                num2 = future2.result()
             
             print(f"Raw model output for {os.path.basename(image_path1)}:")
             print(num1.get('raw_text', 'No response'))
@@ -82,22 +275,11 @@ class FiberLengthDetector:
             print(num2.get('raw_text', 'No response'))
             
             # Calculate difference (like your Colab)
-            length1 = num1.get('detected_length')
-            length2 = num2.get('detected_length')
-            
-            difference = None
-            if (length1 and length1 != 'Not detected' and length1 is not None and 
-                length2 and length2 != 'Not detected' and length2 is not None):
-                try:
-                    val1 = float(length1)
-                    val2 = float(length2)
-                    difference = abs(val1 - val2)
-                    print(f"Fiber length difference: {difference} meters")
-                except (ValueError, TypeError):
-                    print("Could not calculate difference due to invalid numbers")
-                    difference = None
+            difference = self.calculate_difference(num1, num2)
+            if difference is not None:
+                print(f"Fiber length difference: {difference} meters")
             else:
-                print("Could not calculate difference due to missing number(s)")
+                print("Could not calculate difference due to missing or invalid number(s)")
             
             return {
                 'image1_result': num1,
@@ -118,6 +300,32 @@ class FiberLengthDetector:
                 'method': 'Dual Image Analysis - Failed'
             }
     
+    def calculate_difference(self, result1, result2):
+        """
+        Calculate the absolute length difference between two analysis results
+        
+        Args:
+            result1: Result dict for the first image
+            result2: Result dict for the second image
+            
+        Returns:
+            float or None: Absolute difference in meters, None if either length is missing
+        """
+        if not result1 or not result2:
+            return None
+        
+        length1 = result1.get('detected_length')
+        length2 = result2.get('detected_length')
+        
+        if (length1 is None or length1 == 'Not detected' or
+                length2 is None or length2 == 'Not detected'):
+            return None
+        
+        try:
+            return abs(float(length1) - float(length2))
+        except (ValueError, TypeError):
+            return None
+    
     def _image_to_bytes(self, image_path):
         """
         Convert image file to bytes for Ollama processing
@@ -129,20 +337,254 @@ class FiberLengthDetector:
         except Exception as e:
             raise Exception(f"Failed to read image file: {str(e)}")
     
-    def _extract_number_from_image_bytes(self, image_bytes, image_name='uploaded_image'):
+    def _request_key(self, messages, options=None):
+        """Coalescing key: image content hashes plus model, prompt and options"""
+        parts = [self.model_name, json.dumps(options, sort_keys=True)]
+        for message in messages:
+            parts.append(message.get('content', ''))
+            for image in message.get('images') or []:
+                if isinstance(image, EncodedImage):
+                    parts.append(image.digest())
+                elif isinstance(image, (bytes, bytearray)):
+                    parts.append(hashlib.sha256(image).hexdigest())
+                else:
+                    parts.append(str(image))
+        return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
+    
+    @contextmanager
+    def image_time_limit(self):
+        """
+        Give all requests made for one image (or page, clip or tile) in this block image_timeout seconds in total
+        
+        Vote samples and video keyframes share the limit; when it runs out
+        the pending request fails with ImageTimeout. Does nothing while
+        image_timeout is None.
+        """
+        if self.image_timeout is None:
+            yield
+            return
+        token = _image_deadline.set(time.time() + self.image_timeout)
+        try:
+            yield
+        finally:
+            _image_deadline.reset(token)
+    
+    def _chat(self, messages, options=None):
+        """
+        Send a chat request, through the in-process scheduler if one is attached
+        
+        Concurrent identical requests (same image content, model, prompt and
+        options) are coalesced: the first one is sent and the others wait for
+        and share its response. With a concurrency limiter attached, the sent
+        request holds one of its slots and reports its latency to it.
+        """
+        key = self._request_key(messages, options)
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise InferenceCancelled("Deadline reached before the request was sent")
+        image_deadline = _image_deadline.get()
+        if image_deadline is not None and time.time() >= image_deadline:
+            raise ImageTimeout("Image timeout reached before the request was sent")
+        
+        with self._inflight_lock:
+            self.chat_requests += 1
+            pending = self._inflight.get(key)
+            if pending is None:
+                if self.max_calls is not None and self.chat_requests - self.coalesced_requests > self.max_calls:
+                    self.chat_requests -= 1  # never sent
+                    raise InferenceCancelled("Inference budget exhausted")
+                pending = self._inflight[key] = Future()
+                leader = True
+            else:
+                self.coalesced_requests += 1
+                leader = False
+        
+        if not leader:
+            return pending.result()
+        
+        limiter = self.concurrency
+        if limiter is not None:
+            limiter.acquire()
+        latency, failed = None, False
+        try:
+            if limiter is not None and self.deadline is not None and time.time() >= self.deadline:
+                raise InferenceCancelled("Deadline reached while waiting for a request slot")
+            if limiter is not None and image_deadline is not None and time.time() >= image_deadline:
+                raise ImageTimeout("Image timeout reached while waiting for a request slot")
+            sent_at = time.time()
+            try:
+                if self.scheduler is not None:
+                    response = self.scheduler.submit(self._send_chat, messages, options, image_deadline,
+                                                     priority=self.priority).result()
+                else:
+                    response = self._send_chat(messages, options, image_deadline)
+            except (InferenceCancelled, ImageTimeout):
+                raise
+            except BaseException:
+                latency, failed = time.time() - sent_at, True
+                raise
+            latency = time.time() - sent_at
+            pending.set_result(response)
+            return response
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            if limiter is not None:
+                # Cancelled and timed-out images return their slot without a latency observation
+                limiter.release(latency, failed)
+            with self._inflight_lock:
+                del self._inflight[key]
+    
+    def coalescing_stats(self):
+        """How many chat requests were made and how many rode along on an identical in-flight one"""
+        with self._inflight_lock:
+            return {
+                'chat_requests': self.chat_requests,
+                'coalesced_requests': self.coalesced_requests,
+                'sent_requests': self.chat_requests - self.coalesced_requests,
+                'in_flight': len(self._inflight)
+            }
+    
+    def _send_chat(self, messages, options=None, image_deadline=None):
+        """
+        POST a chat request to Ollama
+        
+        Pre-encoded images are spliced straight into the request body and
+        posted on the detector's own HTTP connection; anything else goes
+        through client.chat.
+        
+        Args:
+            image_deadline: Epoch seconds the image's time limit runs out, if it has one
+        """
+        images = [image for message in messages for image in message.get('images') or []]
+        
+        if images and all(isinstance(image, EncodedImage) for image in images):
+            import httpx
+            import ollama
+            
+            # A request may outlive neither the run's deadline nor its image's time limit
+            timeout = self.timeout
+            cut_by = None
+            for limit, name in ((self.deadline, 'deadline'), (image_deadline, 'image')):
+                if limit is None:
+                    continue
+                remaining = limit - time.time()
+                if remaining <= 0:
+                    if name == 'deadline':
+                        raise InferenceCancelled("Deadline reached before the request was sent")
+                    raise ImageTimeout("Image timeout reached before the request was sent")
+                if timeout is None or remaining < timeout:
+                    timeout, cut_by = remaining, name
+            
+            post_options = {'timeout': timeout} if timeout is not None else {}
+            try:
+                response = self.http_client.post('/api/chat', content=build_chat_body(self.model_name, messages, options=options),
+                                                 **post_options)
+            except httpx.TimeoutException as e:
+                if cut_by == 'deadline':
+                    raise InferenceCancelled("Deadline reached while waiting for the model")
+                if cut_by == 'image':
+                    raise ImageTimeout("Image timeout reached while waiting for the model") from e
+                raise
+            if response.status_code >= 400:
+                try:
+                    error = response.json().get('error', response.text)
+                except ValueError:
+                    error = response.text
+                raise ollama.ResponseError(error, response.status_code)
+            return response.json()
+        
+        # Plain client path: hand it base64 text rather than our payload objects
+        messages = [
+            dict(message, images=[image.data.decode('ascii') if isinstance(image, EncodedImage) else image
+                                  for image in message['images']])
+            if message.get('images') else message
+            for message in messages
+        ]
+        return self.client.chat(model=self.model_name, messages=messages, options=options)
+    
+    def _extract_number(self, image_bytes, image_name='uploaded_image'):
+        """Single extraction, or a self-consistency vote when vote_k is set"""
+        if self.vote_k:
+            return self._extract_number_by_voting(image_bytes, image_name)
+        return self._extract_number_from_image_bytes(image_bytes, image_name)
+    
+    def _extract_number_by_voting(self, image_bytes, image_name='uploaded_image'):
+        """
+        Sample the extraction until vote_k samples agree on the number
+        
+        The first wave sends vote_k varied samples concurrently (paraphrased
+        prompts, non-zero temperature). Further waves are sent only while no
+        number has vote_k votes, each just large enough that the leader could
+        still reach vote_k, up to vote_max_samples in total. Confidence is the
+        winner's share of the samples used. When the image's time limit runs out
+        the vote is decided on the samples answered so far.
+        """
+        samples = []
+        votes = {}
+        failures = []
+        
+        def sample(index):
+            prompt = VOTING_PROMPTS[index % len(VOTING_PROMPTS)] if self.prompt == DEFAULT_PROMPT else self.prompt
+            options = {'temperature': VOTING_TEMPERATURE, 'seed': index}
+            try:
+                return self._extract_number_from_image_bytes(image_bytes, image_name, prompt=prompt, options=options)
+            except InferenceCancelled:
+                raise
+            except ImageTimeout as e:
+                failures.append(e)
+                return None  # never answered; not counted as a sample
+            except Exception as e:
+                failures.append(e)
+                return {'detected_length': None, 'error': str(e)}
+        
+        timed_out = False
+        with ThreadPoolExecutor(max_workers=self.vote_k) as executor:
+            while len(samples) < self.vote_max_samples and not timed_out:
+                leader_votes = max(votes.values()) if votes else 0
+                if leader_votes >= self.vote_k:
+                    break
+                
+                wave = min(self.vote_k - leader_votes, self.vote_max_samples - len(samples))
+                for result in executor.map(carry_context(sample), range(len(samples), len(samples) + wave)):
+                    if result is None:
+                        timed_out = True
+                        continue
+                    samples.append(result)
+                    if 'error' not in result:
+                        value = result.get('detected_length')
+                        votes[value] = votes.get(value, 0) + 1
+        
+        if not votes:
+            message = str(failures[-1]) if timed_out else samples[-1].get('error', 'All voting samples failed')
+            raise Exception(message) from (failures[-1] if failures else None)
+        
+        winner, winner_votes = max(votes.items(), key=lambda item: item[1])
+        result = next(r for r in samples if 'error' not in r and r.get('detected_length') == winner)
+        
+        result = dict(result)
+        result['confidence'] = round(100 * winner_votes / len(samples))
+        result['method'] = 'Ollama Model (self-consistency voting)'
+        result['votes'] = [{'value': value, 'count': count}
+                           for value, count in sorted(votes.items(), key=lambda item: -item[1])]
+        result['samples_used'] = len(samples)
+        result['vote_agreed'] = winner_votes >= self.vote_k
+        result['failed_samples'] = sum(1 for r in samples if 'error' in r)
+        return result
+    
+    def _extract_number_from_image_bytes(self, image_bytes, image_name='uploaded_image', prompt=None, options=None):
         """
         Extract handwritten number from image using Ollama model (matching your Colab function)
+        
+        image_bytes may be raw image bytes or an EncodedImage from the payload cache
         """
         try:
             # Send chat request to Ollama model (same as your Colab)
-            response = self.client.chat(
-                model=self.model_name,
-                messages=[{
-                    'role': 'user',
-                    'content': 'Extract the handwritten number in meters from this image.',
-                    'images': [image_bytes]
-                }]
-            )
+            response = self._chat([{
+                'role': 'user',
+                'content': prompt or self.prompt,
+                'images': [image_bytes]
+            }], options)
             
             # Extract the content of the model's response
             content = response['message']['content']
@@ -151,71 +593,32 @@ class FiberLengthDetector:
             print(f"Raw model output for {os.path.basename(image_name) if hasattr(image_name, '__len__') else image_name}:")
             print(content)
             
-            # Use regular expression to find a numerical value (same as your Colab)
-            # optionally followed by "m" or "meters" (case-insensitive)
-            match = re.search(r'(\d+(?:\.\d+)?)(?:\s*m| meters)?', content.lower())
-            
-            detected_length = None
-            confidence = 50  # Base confidence
-            additional_numbers = []
-            
-            if match:
-                # If a match is found, convert the captured number to a float and return it
-                detected_length = float(match.group(1))
-                
-                # Find all numbers for additional_numbers
-                all_matches = re.findall(r'(\d+(?:\.\d+)?)', content.lower())
-                additional_numbers = [float(m) for m in all_matches[1:]]  # Skip the first one
-                
-                # Calculate confidence based on clarity
-                confidence = self._calculate_confidence(content, detected_length)
-            else:
-                # If no match is found, print a message and return None
+            # First number is the reading (same as your Colab); confidence from the wording
+            # (see response_parser.py)
+            parsed = parse_response(content)
+            if parsed['detected_length'] is None:
                 print(f"No number found in {os.path.basename(image_name) if hasattr(image_name, '__len__') else image_name}")
             
             return {
-                'detected_length': detected_length,
-                'unit': 'meters' if detected_length is not None else 'N/A',
-                'confidence': confidence,
+                'detected_length': parsed['detected_length'],
+                'unit': parsed['unit'],
+                'confidence': parsed['confidence'],
                 'method': 'Ollama Model',
                 'raw_text': raw_text,
-                'additional_numbers': additional_numbers,
+                'additional_numbers': parsed['additional_numbers'],
                 'model_used': self.model_name
             }
             
+        except (InferenceCancelled, ImageTimeout):
+            raise
         except Exception as e:
-            raise Exception(f"Failed to process image with Ollama: {str(e)}")
+            raise Exception(f"Failed to process image with Ollama: {str(e)}") from e
     
     def _calculate_confidence(self, model_output, detected_value):
         """
         Calculate confidence score based on model output clarity
-        """
-        confidence = 50  # Base confidence
         
-        # Increase confidence if the model mentions specific measurement terms
-        measurement_terms = ['meter', 'meters', 'm', 'measurement', 'length', 'fiber']
-        for term in measurement_terms:
-            if term.lower() in model_output.lower():
-                confidence += 10
-                break
-        
-        # Increase confidence if the number appears with units
-        if str(detected_value) in model_output and ('m' in model_output.lower() or 'meter' in model_output.lower()):
-            confidence += 20
-        
-        # Increase confidence if model seems certain
-        certainty_words = ['clearly', 'shows', 'reads', 'indicates', 'visible']
-        for word in certainty_words:
-            if word.lower() in model_output.lower():
-                confidence += 5
-        
-        # Decrease confidence if model expresses uncertainty
-        uncertainty_words = ['might', 'appears', 'seems', 'possibly', 'unclear']
-        for word in uncertainty_words:
-            if word.lower() in model_output.lower():
-                confidence -= 10
-        
-        # Ensure confidence is within valid range
-        confidence = max(0, min(100, confidence))
-        
-        return confidence
\ No newline at end of file
+        Measurement terms +10, number with units +20, each certainty word +5,
+        each uncertainty word -10, clamped to 0-100 (see response_parser.score_confidence)
+        """
+        return score_confidence(model_output, detected_value)
\ No newline at end of file
@@ -1,12 +1,8 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
-from PIL import Image, ImageTk
 import json
 import threading
-from fiber_detector import FiberLengthDetector
 import os
-import cv2
-import numpy as np
 
 class EnhancedFiberDetectorGUI:
     def __init__(self, root):
@@ -23,7 +19,8 @@ class EnhancedFiberDetectorGUI:
         self.image_panels = {}  # Store image display panels
         
         self.create_enhanced_widgets()
-        self.initialize_detector()
+        # Start loading the model only once the main loop has painted the window
+        self.root.after(0, lambda: self.root.after_idle(self.initialize_detector))
     
     def create_enhanced_widgets(self):
         # Title Section with Enhanced Styling
@@ -205,7 +202,10 @@ class EnhancedFiberDetectorGUI:
         """Initialize the detector in a separate thread"""
         def init_thread():
             try:
-                self.detector = FiberLengthDetector(model_name='llava-phi3')
+                # Deferred import keeps ollama/httpx off the GUI's startup path
+                from fiber_detector import FiberLengthDetector
+                # Interactive class: jumps ahead of queued batch work on a shared scheduler
+                self.detector = FiberLengthDetector(model_name='llava-phi3', priority='interactive')
                 self.root.after(0, self.on_detector_ready)
             except Exception as e:
                 error_msg = str(e)
@@ -315,6 +315,9 @@ class EnhancedFiberDetectorGUI:
         
         # Image display
         try:
+            # PIL is only needed once an image is shown
+            from PIL import Image, ImageTk
+            
             # Load and resize image
             pil_image = Image.open(file_path)
             display_size = (400, 300) if side else (600, 400)
@@ -633,12 +636,63 @@ class EnhancedFiberDetectorGUI:
             try:
                 with open(filename, 'w') as f:
                     json.dump(self.current_result, f, indent=2)
-                messagebox.showinfo("Saved", f"Results saved to:\n{filename}")
             except Exception as e:
                 messagebox.showerror("Save Error", f"Failed to save file:\n{e}")
+                return
+            
+            store_note = self.record_results(filename)
+            messagebox.showinfo("Saved", f"Results saved to:\n{filename}{store_note}")
+    
+    def record_results(self, source):
+        """Add the current result to the shared results store; returns a note for the save dialog"""
+        from datetime import datetime
+        from results_store import ResultsStore, DEFAULT_STORE, records_from_output
+        
+        data = self.current_result
+        if 'filepath' not in data and 'image1_result' not in data and self.selected_files:
+            data = dict(data, filepath=self.selected_files[0])
+        
+        try:
+            store = ResultsStore(DEFAULT_STORE)
+            try:
+                records, _ = records_from_output(data)
+                store.record_run(records, kind='gui', source=os.path.abspath(source),
+                                 default_time=datetime.now().isoformat())
+            finally:
+                store.close()
+            return f"\n\nAlso added to results store:\n{os.path.abspath(DEFAULT_STORE)}"
+        except Exception as e:
+            return f"\n\n⚠️ Results store not updated: {e}"
+
+def start_profiling(root):
+    """
+    Opt-in GUI profiling (FIBER_PROFILE=1): CPU/memory profile of the session and a
+    log of callbacks that block the Tk main loop longer than FIBER_PROFILE_STALL_MS
+    
+    Reports go to FIBER_PROFILE_DIR (default: ./profiles).
+    """
+    from datetime import datetime
+    from profiling import RunProfiler, TkStallDetector, memory_interval_from_env, DEFAULT_STALL_THRESHOLD
+    
+    output_dir = os.environ.get('FIBER_PROFILE_DIR', 'profiles')
+    run_name = f"gui_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    try:
+        threshold = float(os.environ['FIBER_PROFILE_STALL_MS']) / 1000
+    except (KeyError, ValueError):
+        threshold = DEFAULT_STALL_THRESHOLD
+    
+    profiler = RunProfiler(output_dir, run_name, memory_interval=memory_interval_from_env()).start()
+    stall_detector = TkStallDetector(root, os.path.join(output_dir, f"{run_name}_ui_stalls.log"), threshold).start()
+    print(f"🔬 Profiling GUI session, reports in: {os.path.abspath(output_dir)}")
+    return profiler, stall_detector
 
 def main():
     root = tk.Tk()
+    
+    profiling_session = None
+    if os.environ.get('FIBER_PROFILE', '').lower() in ('1', 'true', 'yes', 'on'):
+        profiling_session = start_profiling(root)
+    
     app = EnhancedFiberDetectorGUI(root)
     
     # Center the window
@@ -648,6 +702,12 @@ def main():
     root.geometry(f"+{x}+{y}")
     
     root.mainloop()
+    
+    if profiling_session:
+        profiler, stall_detector = profiling_session
+        stall_detector.stop()
+        profiler.stop()
+        print(f"🔬 UI stalls logged: {stall_detector.stalls}")
 
 if __name__ == "__main__":
     main()
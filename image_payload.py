@@ -0,0 +1,207 @@
+import os
+import json
+import mmap
+import time
+import threading
+import hashlib
+import binascii
+from collections import OrderedDict
+from archive_ingest import split_member_path, read_archive_member
+
+# Multiple of 3 so every chunk encodes to whole base64 quanta (no padding mid-stream)
+ENCODE_CHUNK_BYTES = 3 * 256 * 1024
+
+
+class EncodedImage:
+    """Base64-encoded image payload (ASCII bytes or bytearray), ready to splice into a request body"""
+    __slots__ = ('data', '_digest', 'content_hash')
+    
+    def __init__(self, data, content_hash=None):
+        self.data = data
+        self._digest = None
+        # SHA-256 of the original image bytes, when encoded from a file or archive member
+        self.content_hash = content_hash
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def digest(self):
+        """SHA-256 of the payload, computed once (cached payloads are hashed only on first use)"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+
+def _encode_view(view, size):
+    """Base64-encode a buffer chunk by chunk straight into the payload, hashing the raw bytes on the way"""
+    if size <= ENCODE_CHUNK_BYTES:
+        # One chunk: the encoder's output already is the payload
+        return EncodedImage(binascii.b2a_base64(view, newline=False), hashlib.sha256(view).hexdigest())
+    
+    encoded = bytearray(4 * ((size + 2) // 3))
+    content_hash = hashlib.sha256()
+    
+    position = 0
+    for offset in range(0, size, ENCODE_CHUNK_BYTES):
+        raw = view[offset:offset + ENCODE_CHUNK_BYTES]
+        content_hash.update(raw)
+        chunk = binascii.b2a_base64(raw, newline=False)
+        encoded[position:position + len(chunk)] = chunk
+        position += len(chunk)
+    
+    return EncodedImage(encoded, content_hash.hexdigest())
+
+
+def encode_image_bytes(data):
+    """Base64-encode in-memory image bytes (e.g. an archive member) for the Ollama API"""
+    if not data:
+        return EncodedImage(b'', hashlib.sha256(b'').hexdigest())
+    with memoryview(data) as view:
+        return _encode_view(view, len(data))
+
+
+def encode_image_file(image_path):
+    """
+    Base64-encode an image file for the Ollama API with a single full-size allocation
+    
+    The file is memory-mapped and encoded chunk by chunk into the payload's own
+    buffer, so the only full-size object created is the returned payload. Archive member
+    paths ("bundle.zip!reel.jpg") are read from the archive instead.
+    
+    Returns:
+        EncodedImage: Base64 payload of the file
+    """
+    try:
+        if split_member_path(image_path)[1] is not None:
+            return encode_image_bytes(read_archive_member(image_path))
+        
+        with open(image_path, 'rb') as image_file:
+            size = os.fstat(image_file.fileno()).st_size
+            if size == 0:
+                return EncodedImage(b'', hashlib.sha256(b'').hexdigest())
+            
+            with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    return _encode_view(view, size)
+                finally:
+                    view.release()
+    except Exception as e:
+        raise Exception(f"Failed to read image file: {str(e)}")
+
+
+class ImagePayloadCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        LRU cache of encoded image payloads
+        
+        Entries are keyed by path, size and mtime, so an edited file is re-encoded.
+        Archive members are keyed by member name plus the archive's size and mtime.
+        Retries, voting and dual comparisons that revisit an image reuse its payload.
+        
+        Args:
+            max_bytes: Total size of cached payloads before the oldest are evicted
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+    
+    @staticmethod
+    def _key(image_path):
+        file_path, member = split_member_path(image_path)
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), member, stat.st_size, stat.st_mtime_ns)
+    
+    def get(self, image_path, data=None):
+        """
+        Return the EncodedImage for image_path, encoding it on a miss
+        
+        data: Image bytes the caller has already read (e.g. streamed from an
+              archive), encoded on a miss instead of reading image_path again
+        """
+        try:
+            key = self._key(image_path)
+        except OSError as e:
+            raise Exception(f"Failed to read image file: {str(e)}")
+        
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+            self.misses += 1
+        
+        start = time.perf_counter()
+        payload = encode_image_file(image_path) if data is None else encode_image_bytes(data)
+        elapsed = time.perf_counter() - start
+        
+        with self._lock:
+            self.encode_seconds += elapsed
+            if len(payload) <= self.max_bytes and key not in self._entries:
+                self._entries[key] = payload
+                self._total_bytes += len(payload)
+                while self._total_bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._total_bytes -= len(evicted)
+        return payload
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'cached_bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'encode_seconds': round(self.encode_seconds, 3)
+            }
+
+
+def build_chat_body(model, messages, stream=False, options=None):
+    """
+    Serialize an Ollama /api/chat request, splicing EncodedImage payloads in as-is
+    
+    The ollama client would base64-encode, JSON-dump and UTF-8-encode every image
+    again (several full-size copies); here the body is the only new full-size object.
+    
+    Returns:
+        bytes: JSON request body
+    """
+    images = []
+    
+    def placeholder(image):
+        images.append(image.data)
+        return f"__fiber_image_{len(images) - 1}__"
+    
+    skeleton = {
+        'model': model,
+        'messages': [
+            dict(message, images=[placeholder(image) if isinstance(image, EncodedImage) else image
+                                  for image in message['images']])
+            if message.get('images') else message
+            for message in messages
+        ],
+        'stream': stream
+    }
+    if options:
+        skeleton['options'] = options
+    text = json.dumps(skeleton).encode('utf-8')
+    
+    parts = []
+    position = 0
+    for i, data in enumerate(images):
+        marker = f'"__fiber_image_{i}__"'.encode('ascii')
+        index = text.index(marker, position)
+        parts.extend((text[position:index], b'"', data, b'"'))
+        position = index + len(marker)
+    parts.append(text[position:])
+    return b''.join(parts)
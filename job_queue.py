@@ -0,0 +1,372 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import argparse
+from datetime import datetime
+from archive_ingest import MemberReader, absolute_path, display_name, split_member_path
+
+DEFAULT_DB = 'fiber_jobs.db'
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+# A failed job waits RETRY_BASE_SECONDS, doubling per attempt up to RETRY_MAX_SECONDS, before it is leased again
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+# Connection failures and timeouts don't use up attempts, but an image that keeps timing out is dead-lettered after this many
+DEFAULT_MAX_TRANSIENT_FAILURES = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    filepath TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT,
+    result TEXT,
+    not_before REAL,
+    transient_failures INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires);
+"""
+
+
+class JobQueue:
+    def __init__(self, db_path=DEFAULT_DB, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Crash-safe image job queue in SQLite (WAL mode)
+        
+        Jobs move pending -> leased -> done. A leased job whose lease runs out
+        (its worker crashed or hung) is handed to the next worker; after
+        max_attempts failed or expired attempts it moves to 'dead'. Every state
+        change is its own transaction, so killing a worker loses at most the
+        job it had leased, and only until the lease expires.
+        
+        Args:
+            db_path: SQLite database file
+            max_attempts: Attempts before a job is dead-lettered
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        # Autocommit; transactions are opened explicitly where they matter
+        self.connection = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # Survives process crashes (the kill -9 case); only an OS crash can drop the last commits
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        # Queues created before retry backoff existed
+        columns = {row['name'] for row in self.connection.execute('PRAGMA table_info(jobs)')}
+        for column, definition in (('not_before', 'REAL'), ('transient_failures', 'INTEGER NOT NULL DEFAULT 0')):
+            if column not in columns:
+                self.connection.execute(f'ALTER TABLE jobs ADD COLUMN {column} {definition}')
+    
+    def close(self):
+        self.connection.close()
+    
+    def enqueue(self, filepaths):
+        """Add files to the queue; files already queued are left as they are"""
+        now = time.time()
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            before = self.connection.total_changes
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO jobs (filepath, enqueued_at, updated_at) VALUES (?, ?, ?)',
+                [(absolute_path(path), now, now) for path in filepaths]
+            )
+            return self.connection.total_changes - before
+    
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Atomically claim the next pending (or expired) job whose retry time has come
+        
+        Returns:
+            dict or None: The job row, or None when nothing is available
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            
+            # Expired leases that have used up their attempts go to the dead-letter state
+            self.connection.execute(
+                "UPDATE jobs SET status = 'dead', lease_owner = NULL, updated_at = ?, "
+                "last_error = COALESCE(last_error, 'lease expired') "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            
+            row = self.connection.execute(
+                "SELECT * FROM jobs WHERE (status = 'pending' AND (not_before IS NULL OR not_before <= ?)) "
+                "OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1", (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            self.connection.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row['id'])
+            )
+            job = dict(row)
+            job['attempts'] += 1
+            return job
+    
+    def complete(self, job_id, worker_id, result):
+        """Store a result; ignored if the lease was lost to another worker meanwhile"""
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ?, last_error = NULL WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (json.dumps(result), time.time(), job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+    
+    def fail(self, job_id, worker_id, error, transient=False, retry_delay=None):
+        """
+        Return a failed job for a later retry, or dead-letter it after max_attempts
+        
+        Args:
+            transient: The server was unreachable or timed out; the attempt is
+                       given back (up to DEFAULT_MAX_TRANSIENT_FAILURES times)
+            retry_delay: Seconds before the job may be leased again
+                         (default: exponential backoff on the attempts used)
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            row = self.connection.execute(
+                "SELECT attempts, transient_failures FROM jobs WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return False  # the lease was lost to another worker meanwhile
+            
+            attempts, transient_failures = row['attempts'], row['transient_failures']
+            if transient:
+                attempts -= 1
+                transient_failures += 1
+            if retry_delay is None:
+                retry_delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+            dead = attempts >= self.max_attempts or transient_failures >= DEFAULT_MAX_TRANSIENT_FAILURES
+            
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, transient_failures = ?, not_before = ?, "
+                "lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                ('dead' if dead else 'pending', attempts, transient_failures, now + retry_delay, error, now, job_id)
+            )
+            return True
+    
+    def requeue_dead(self):
+        """Give dead-lettered jobs a fresh set of attempts"""
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, transient_failures = 0, not_before = NULL, "
+                "updated_at = ? WHERE status = 'dead'",
+                (time.time(),)
+            )
+            return cursor.rowcount
+    
+    def status(self):
+        """Job counts per state plus recent throughput"""
+        now = time.time()
+        counts = {name: 0 for name in ('pending', 'leased', 'done', 'dead')}
+        for row in self.connection.execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status'):
+            counts[row['status']] = row['n']
+        
+        waiting = self.connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'pending' AND not_before > ?", (now,)
+        ).fetchone()[0]
+        expired = self.connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'leased' AND lease_expires < ?", (now,)
+        ).fetchone()[0]
+        done_last_minute = self.connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'done' AND updated_at >= ?", (now - 60,)
+        ).fetchone()[0]
+        workers = [row[0] for row in self.connection.execute(
+            "SELECT DISTINCT lease_owner FROM jobs WHERE status = 'leased' AND lease_expires >= ?", (now,)
+        )]
+        
+        return {
+            'total': sum(counts.values()),
+            **counts,
+            'waiting_retry': waiting,
+            'expired_leases': expired,
+            'active_workers': workers,
+            'completed_last_minute': done_last_minute
+        }
+    
+    def export(self, output_path):
+        """Write finished results (and the dead-letter list) in the batch_results.json layout"""
+        results = []
+        for row in self.connection.execute("SELECT filepath, result FROM jobs WHERE status = 'done' ORDER BY filepath"):
+            results.append(json.loads(row['result']))
+        dead = [
+            {'filepath': row['filepath'], 'attempts': row['attempts'], 'last_error': row['last_error']}
+            for row in self.connection.execute(
+                "SELECT filepath, attempts, last_error FROM jobs WHERE status = 'dead' ORDER BY filepath")
+        ]
+        status = self.status()
+        
+        summary = {
+            "processing_summary": {
+                "total_files": status['total'],
+                "successfully_processed": status['done'],
+                "failed_files": status['dead'],
+                "unfinished_files": status['pending'] + status['leased'],
+                "processed_at": datetime.now().isoformat(),
+                "job_database": os.path.abspath(self.db_path)
+            },
+            "results": results,
+            "dead_letter": dead
+        }
+        with open(output_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+def run_worker(db_path, model_name='llava-phi3', lease_seconds=DEFAULT_LEASE_SECONDS,
+               max_attempts=DEFAULT_MAX_ATTEMPTS, exit_when_idle=True, poll_seconds=2.0):
+    """
+    Lease and process jobs until the queue is drained
+    
+    Each worker process owns one FiberLengthDetector. Failed jobs are retried
+    after a backoff; while the server is unreachable or timing out, the worker
+    itself also backs off instead of burning through the queue. Archive members are read
+    through a MemberReader: jobs are leased in enqueue (archive) order, so each
+    worker makes one forward pass through a .tar.gz rather than decompressing
+    it from the start for every member.
+    """
+    from fiber_detector import FiberLengthDetector
+    
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    queue = JobQueue(db_path, max_attempts)
+    detector = FiberLengthDetector(model_name, priority='batch')
+    members = MemberReader()
+    processed = 0
+    # Connection failures/timeouts in a row: the server is down, so wait longer each time
+    outage_failures = 0
+    
+    print(f"👷 Worker {worker_id} started")
+    try:
+        while True:
+            job = queue.lease(worker_id, lease_seconds)
+            if job is None:
+                status = queue.status()
+                if exit_when_idle and status['leased'] == 0 and status['pending'] == 0:
+                    break
+                time.sleep(poll_seconds)  # retries may come due and other workers' leases may expire
+                continue
+            
+            image_path = job['filepath']
+            start_time = time.time()
+            if split_member_path(image_path)[1] is not None:
+                try:
+                    result = detector.process_image(image_path, members.read(image_path))
+                except Exception as e:
+                    result = {'error': f"Failed to read archive member: {e}"}
+            else:
+                result = detector.process_image(image_path)
+            processing_time = time.time() - start_time
+            
+            if 'error' in result:
+                if result.get('transient'):
+                    outage_failures += 1
+                    backoff = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (outage_failures - 1))
+                    queue.fail(job['id'], worker_id, result['error'], transient=True, retry_delay=backoff)
+                    print(f"   🔌 [{worker_id}] {display_name(image_path)}: {result['error']} "
+                          f"- server unreachable, pausing {backoff}s")
+                    time.sleep(backoff)
+                else:
+                    outage_failures = 0
+                    queue.fail(job['id'], worker_id, result['error'])
+                    print(f"   💥 [{worker_id}] {display_name(image_path)} "
+                          f"(attempt {job['attempts']}): {result['error']}")
+                continue
+            
+            outage_failures = 0
+            result['filename'] = display_name(image_path)
+            result['filepath'] = image_path
+            result['processed_at'] = datetime.now().isoformat()
+            result['processing_time_seconds'] = round(processing_time, 2)
+            result['worker'] = worker_id
+            if queue.complete(job['id'], worker_id, result):
+                processed += 1
+                print(f"   ✅ [{worker_id}] {display_name(image_path)}: {result.get('detected_length')}")
+    finally:
+        members.close()
+        queue.close()
+    print(f"👋 Worker {worker_id} finished ({processed} jobs)")
+    return processed
+
+
+def main():
+    from batch_processor import find_image_files, find_archive_images
+    
+    parser = argparse.ArgumentParser(description="Durable fiber image job queue")
+    parser.add_argument('--db', default=DEFAULT_DB, help=f"Queue database (default: {DEFAULT_DB})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    enqueue = commands.add_parser('enqueue', help="Queue every image in a directory, including zip/tar archive members")
+    enqueue.add_argument('input_dir')
+    
+    work = commands.add_parser('work', help="Run worker processes until the queue is drained")
+    work.add_argument('--workers', type=int, default=2)
+    work.add_argument('--model', default='llava-phi3')
+    work.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS)
+    work.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS)
+    work.add_argument('--forever', action='store_true', help="Keep polling for new jobs instead of exiting")
+    
+    commands.add_parser('status', help="Show queue counts")
+    
+    export = commands.add_parser('export', help="Write finished results as JSON")
+    export.add_argument('output_file')
+    
+    commands.add_parser('requeue-dead', help="Retry dead-lettered jobs")
+    
+    args = parser.parse_args()
+    
+    if args.command == 'enqueue':
+        image_files = find_image_files(args.input_dir) + find_archive_images(args.input_dir)
+        queue = JobQueue(args.db)
+        added = queue.enqueue(image_files)
+        print(f"📥 Queued {added} new of {len(image_files)} images found in {args.input_dir}")
+        print(f"   Queue: {args.db}")
+    
+    elif args.command == 'work':
+        import multiprocessing
+        print(f"🚀 Starting {args.workers} worker process(es) on {args.db}")
+        worker_args = (args.db, args.model, args.lease_seconds, args.max_attempts, not args.forever)
+        processes = [multiprocessing.Process(target=run_worker, args=worker_args) for _ in range(args.workers)]
+        start_time = time.time()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        status = JobQueue(args.db).status()
+        print(f"\n📊 Done in {(time.time() - start_time) / 60:.1f} minutes: "
+              f"{status['done']} done, {status['dead']} dead, {status['pending'] + status['leased']} unfinished")
+    
+    elif args.command == 'status':
+        status = JobQueue(args.db).status()
+        print(f"📊 Queue {args.db}")
+        for name in ('pending', 'leased', 'done', 'dead'):
+            print(f"   {name:<8} {status[name]}")
+        print(f"   Waiting to retry: {status['waiting_retry']}")
+        print(f"   Expired leases: {status['expired_leases']}")
+        print(f"   Active workers: {', '.join(status['active_workers']) or 'none'}")
+        print(f"   Completed in the last minute: {status['completed_last_minute']}")
+    
+    elif args.command == 'export':
+        summary = JobQueue(args.db).export(args.output_file)
+        print(f"💾 Exported {len(summary['results'])} results "
+              f"({len(summary['dead_letter'])} dead-lettered) to {args.output_file}")
+    
+    elif args.command == 'requeue-dead':
+        print(f"🔁 Requeued {JobQueue(args.db).requeue_dead()} dead job(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from fiber_detector import FiberLengthDetector, DEFAULT_PROMPT
+
+# Used when no evaluation config is given
+DEFAULT_EVAL_CONFIG = {
+    "models": ["llava-phi3"],
+    "prompt_profiles": {
+        "default": DEFAULT_PROMPT
+    },
+    "host": None
+}
+
+
+class ModelEvaluator:
+    def __init__(self, labels_path, eval_config=None, tolerance=0.0):
+        """
+        Evaluate model/prompt combinations against a labeled image set
+        
+        Args:
+            labels_path: CSV with filename,expected_length rows (paths relative to the CSV)
+            eval_config: Dict with "models", "prompt_profiles" and optional "host"
+            tolerance: Maximum absolute error (meters) still counted as an exact match
+        """
+        self.labels = self._load_labels(labels_path)
+        self.eval_config = eval_config or DEFAULT_EVAL_CONFIG
+        self.tolerance = tolerance
+    
+    @staticmethod
+    def _load_labels(labels_path):
+        """Read ground-truth lengths; header row is optional"""
+        base_dir = os.path.dirname(os.path.abspath(labels_path))
+        labels = []
+        
+        with open(labels_path, newline='') as f:
+            for row in csv.reader(f):
+                row = [cell.strip() for cell in row]
+                if len(row) < 2 or not row[0] or row[0].startswith('#'):
+                    continue
+                try:
+                    expected = float(row[1])
+                except ValueError:
+                    continue  # header row
+                path = row[0] if os.path.isabs(row[0]) else os.path.join(base_dir, row[0])
+                labels.append({'filepath': path, 'expected_length': expected})
+        
+        if not labels:
+            raise Exception(f"No labeled images found in {labels_path}")
+        return labels
+    
+    def evaluate(self):
+        """
+        Run every model x prompt profile over the labeled set
+        
+        Returns:
+            dict: Per-config metrics, the Pareto frontier and the recommended config
+        """
+        models = self.eval_config.get('models', DEFAULT_EVAL_CONFIG['models'])
+        profiles = self.eval_config.get('prompt_profiles', DEFAULT_EVAL_CONFIG['prompt_profiles'])
+        host = self.eval_config.get('host')
+        
+        evaluations = []
+        for model_name in models:
+            for profile_name, prompt in profiles.items():
+                print(f"\n🧪 Evaluating model={model_name} prompt={profile_name}")
+                print("=" * 60)
+                try:
+                    detector = FiberLengthDetector(model_name, prompt=prompt, host=host)
+                except Exception as e:
+                    print(f"   💥 Skipping: {e}")
+                    evaluations.append({
+                        'model_name': model_name,
+                        'prompt_profile': profile_name,
+                        'prompt': prompt,
+                        'error': str(e)
+                    })
+                    continue
+                evaluations.append(self._evaluate_config(detector, profile_name))
+        
+        scored = [e for e in evaluations if 'error' not in e]
+        frontier = self.pareto_frontier(scored)
+        
+        return {
+            'evaluated_at': datetime.now().isoformat(),
+            'labeled_images': len(self.labels),
+            'tolerance': self.tolerance,
+            'evaluations': evaluations,
+            'pareto_frontier': [self._config_name(e) for e in frontier],
+            'recommended': self.recommend(frontier)
+        }
+    
+    def _evaluate_config(self, detector, profile_name):
+        """Measure accuracy and latency of one detector configuration"""
+        latencies = []
+        abs_errors = []
+        exact_matches = 0
+        detected = 0
+        failed = 0
+        per_image = []
+        
+        start_time = time.time()
+        for i, label in enumerate(self.labels, 1):
+            image_start = time.time()
+            result = detector.process_image(label['filepath'])
+            latency = time.time() - image_start
+            latencies.append(latency)
+            
+            if 'error' in result:
+                failed += 1
+            
+            length = result.get('detected_length')
+            error = None
+            if isinstance(length, (int, float)):
+                detected += 1
+                error = abs(length - label['expected_length'])
+                abs_errors.append(error)
+                if error <= self.tolerance:
+                    exact_matches += 1
+            
+            per_image.append({
+                'filename': os.path.basename(label['filepath']),
+                'expected_length': label['expected_length'],
+                'detected_length': length,
+                'absolute_error': error,
+                'latency_seconds': round(latency, 3),
+                'request_error': result.get('error')
+            })
+            
+            status = "✅" if error is not None and error <= self.tolerance else "❌"
+            print(f"   [{i}/{len(self.labels)}] {status} {os.path.basename(label['filepath'])}: "
+                  f"{length} (expected {label['expected_length']}) in {latency:.2f}s")
+        
+        total_time = time.time() - start_time
+        total = len(self.labels)
+        
+        if failed == total:
+            # Nothing but request errors; timings would be meaningless
+            return {
+                'model_name': detector.model_name,
+                'prompt_profile': profile_name,
+                'prompt': detector.prompt,
+                'error': per_image[-1].get('request_error') or 'All requests failed'
+            }
+        
+        return {
+            'model_name': detector.model_name,
+            'prompt_profile': profile_name,
+            'prompt': detector.prompt,
+            'request_error_rate': round(failed / total, 4),
+            'accuracy': round(exact_matches / total, 4),
+            'detection_rate': round(detected / total, 4),
+            'mean_absolute_error': round(sum(abs_errors) / len(abs_errors), 4) if abs_errors else None,
+            'max_absolute_error': round(max(abs_errors), 4) if abs_errors else None,
+            'images_per_second': round(total / total_time, 4) if total_time > 0 else None,
+            'p50_latency_seconds': round(self._percentile(latencies, 50), 3),
+            'p95_latency_seconds': round(self._percentile(latencies, 95), 3),
+            'per_image': per_image
+        }
+    
+    @staticmethod
+    def _percentile(values, percent):
+        """Nearest-rank percentile"""
+        ordered = sorted(values)
+        rank = max(1, -(-len(ordered) * percent // 100))
+        return ordered[int(rank) - 1]
+    
+    @staticmethod
+    def _config_name(evaluation):
+        return f"{evaluation['model_name']} / {evaluation['prompt_profile']}"
+    
+    @staticmethod
+    def pareto_frontier(evaluations):
+        """
+        Configs not dominated on (higher accuracy, lower p95 latency)
+        
+        Returns them sorted from fastest to slowest.
+        """
+        frontier = []
+        for candidate in evaluations:
+            dominated = any(
+                other['accuracy'] >= candidate['accuracy'] and
+                other['p95_latency_seconds'] <= candidate['p95_latency_seconds'] and
+                (other['accuracy'] > candidate['accuracy'] or
+                 other['p95_latency_seconds'] < candidate['p95_latency_seconds'])
+                for other in evaluations
+            )
+            if not dominated:
+                frontier.append(candidate)
+        return sorted(frontier, key=lambda e: e['p95_latency_seconds'])
+    
+    def recommend(self, frontier):
+        """Fastest frontier config that reaches the best accuracy seen"""
+        if not frontier:
+            return None
+        best_accuracy = max(e['accuracy'] for e in frontier)
+        best = next(e for e in frontier if e['accuracy'] == best_accuracy)
+        return {
+            'model_name': best['model_name'],
+            'prompt_profile': best['prompt_profile'],
+            'prompt': best['prompt'],
+            'host': self.eval_config.get('host'),
+            'accuracy': best['accuracy'],
+            'p95_latency_seconds': best['p95_latency_seconds'],
+            'images_per_second': best['images_per_second']
+        }
+
+
+def print_report(report):
+    print(f"\n{'='*60}")
+    print("📊 MODEL EVALUATION COMPLETE!")
+    print(f"{'='*60}")
+    print(f"🏷️  Labeled images: {report['labeled_images']}")
+    print(f"\n{'Config':<40} {'Acc':>6} {'MAE':>8} {'img/s':>7} {'p95 s':>7}")
+    for e in report['evaluations']:
+        name = ModelEvaluator._config_name(e)
+        if 'error' in e:
+            print(f"{name:<40} 💥 {e['error']}")
+            continue
+        mae = '-' if e['mean_absolute_error'] is None else e['mean_absolute_error']
+        marker = " ⭐" if name in report['pareto_frontier'] else ""
+        print(f"{name:<40} {e['accuracy']:>6.1%} {mae:>8} {e['images_per_second']:>7} "
+              f"{e['p95_latency_seconds']:>7}{marker}")
+    print("\n⭐ = Pareto frontier (accuracy vs p95 latency)")
+    
+    recommended = report['recommended']
+    if recommended:
+        print(f"\n🏆 Recommended: {recommended['model_name']} with prompt "
+              f"'{recommended['prompt_profile']}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate vision models on a labeled fiber image set")
+    parser.add_argument('labels', help="CSV of filename,expected_length")
+    parser.add_argument('--config', help="JSON with models, prompt_profiles and optional host")
+    parser.add_argument('--host', help="Ollama server URL (overrides the config)")
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help="Absolute error in meters still counted as exact (default: 0)")
+    parser.add_argument('--report', default='model_evaluation.json', help="Where to write the full report")
+    parser.add_argument('--save-config', default='recommended_config.json',
+                        help="Where to write the recommended detector config")
+    args = parser.parse_args()
+    
+    eval_config = dict(DEFAULT_EVAL_CONFIG)
+    if args.config:
+        with open(args.config, 'r') as f:
+            eval_config.update(json.load(f))
+    if args.host:
+        eval_config['host'] = args.host
+    
+    print("🚀 Fiber Model Evaluation")
+    print("=" * 40)
+    
+    try:
+        evaluator = ModelEvaluator(args.labels, eval_config, args.tolerance)
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    report = evaluator.evaluate()
+    print_report(report)
+    
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Report saved to: {args.report}")
+    
+    if report['recommended']:
+        with open(args.save_config, 'w') as f:
+            json.dump(report['recommended'], f, indent=2)
+        print(f"💾 Recommended config saved to: {args.save_config}")
+        print(f"   Load it with FiberLengthDetector.from_config('{args.save_config}')")
+
+if __name__ == "__main__":
+    main()
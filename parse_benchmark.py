@@ -0,0 +1,118 @@
+import re
+import sys
+import time
+import random
+from response_parser import parse_response, parse_many
+
+# Reply shapes seen from llava-phi3 on drum labels
+TEMPLATES = [
+    "{n} m",
+    "The label clearly shows {n} meters.",
+    "It reads {n}m",
+    "The handwritten number appears to be {n}, possibly {m}.",
+    "The image shows a fiber drum label. The length written on it seems to be {n} meters, "
+    "although the last digit might be {d}.",
+    "I can't read a number in this image, the handwriting is unclear.",
+    "Measurement: {n} m (length of fiber on the drum). The marking is visible and indicates {n}.",
+    "There are several numbers: {m}, {n} and {d}. The one that looks like a length is {n} meters.",
+]
+
+
+def legacy_parse(content):
+    """The per-call parsing path before response_parser (kept verbatim for comparison)"""
+    match = re.search(r'(\d+(?:\.\d+)?)(?:\s*m| meters)?', content.lower())
+    detected_length = None
+    confidence = 50
+    additional_numbers = []
+    if match:
+        detected_length = float(match.group(1))
+        all_matches = re.findall(r'(\d+(?:\.\d+)?)', content.lower())
+        additional_numbers = [float(m) for m in all_matches[1:]]
+        confidence = _legacy_confidence(content, detected_length)
+    return {
+        'detected_length': detected_length,
+        'unit': 'meters' if detected_length is not None else 'N/A',
+        'confidence': confidence,
+        'additional_numbers': additional_numbers
+    }
+
+
+def _legacy_confidence(model_output, detected_value):
+    confidence = 50
+    measurement_terms = ['meter', 'meters', 'm', 'measurement', 'length', 'fiber']
+    for term in measurement_terms:
+        if term.lower() in model_output.lower():
+            confidence += 10
+            break
+    if str(detected_value) in model_output and ('m' in model_output.lower() or 'meter' in model_output.lower()):
+        confidence += 20
+    certainty_words = ['clearly', 'shows', 'reads', 'indicates', 'visible']
+    for word in certainty_words:
+        if word.lower() in model_output.lower():
+            confidence += 5
+    uncertainty_words = ['might', 'appears', 'seems', 'possibly', 'unclear']
+    for word in uncertainty_words:
+        if word.lower() in model_output.lower():
+            confidence -= 10
+    return max(0, min(100, confidence))
+
+
+def make_replies(count, seed=0):
+    """Synthetic model replies built from TEMPLATES"""
+    rng = random.Random(seed)
+    replies = []
+    for _ in range(count):
+        n = rng.choice([str(rng.randint(1, 5000)), f"{rng.uniform(1, 5000):.1f}"])
+        text = rng.choice(TEMPLATES).format(n=n, m=rng.randint(1, 5000), d=rng.randint(0, 9))
+        replies.append(text.upper() if rng.random() < 0.05 else text)
+    return replies
+
+
+def run_benchmark(count=200000, workers=None):
+    """
+    Time the legacy per-call parser against response_parser, serial and across processes
+    
+    Returns:
+        dict: seconds and replies/second per path, and how many replies disagreed
+    """
+    replies = make_replies(count)
+    timings = {}
+    
+    start = time.perf_counter()
+    legacy = [legacy_parse(text) for text in replies]
+    timings['legacy per-call'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    shared = [parse_response(text) for text in replies]
+    timings['response_parser'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    parallel = list(parse_many(replies, workers))
+    timings['response_parser, all cores'] = time.perf_counter() - start
+    
+    mismatches = sum(1 for a, b, c in zip(legacy, shared, parallel) if not a == b == c)
+    return {
+        'replies': count,
+        'paths': {name: {'seconds': round(seconds, 3), 'replies_per_second': round(count / seconds)}
+                  for name, seconds in timings.items()},
+        'mismatches': mismatches
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    
+    print("🚀 Response Parsing Benchmark")
+    print("=" * 40)
+    
+    report = run_benchmark(count, workers)
+    baseline = report['paths']['legacy per-call']['seconds']
+    print(f"\n📝 {report['replies']} replies")
+    for name, stats in report['paths'].items():
+        print(f"   • {name:<26} {stats['seconds']:8.3f}s | {stats['replies_per_second']:>9} replies/s "
+              f"| {baseline / stats['seconds']:.1f}x")
+    print(f"\n{'✅' if report['mismatches'] == 0 else '❌'} Results differing from the legacy parser: {report['mismatches']}")
+
+if __name__ == "__main__":
+    main()
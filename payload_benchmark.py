@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import base64
+import tracemalloc
+from image_payload import ImagePayloadCache, encode_image_file, build_chat_body
+
+MODEL = 'llava-phi3'
+PROMPT = 'Extract the handwritten number in meters from this image.'
+
+
+try:
+    # Imported up front so no path's traced peak includes the import
+    from ollama._client import _copy_messages
+except ImportError:
+    _copy_messages = None
+
+
+def _client_body(image_bytes):
+    """Request body the ollama client builds from raw image bytes"""
+    messages = [{'role': 'user', 'content': PROMPT, 'images': [image_bytes]}]
+    if _copy_messages is not None:
+        payload = {'model': MODEL, 'messages': [m.model_dump(exclude_none=True) for m in _copy_messages(messages)],
+                   'stream': False}
+    else:
+        # Without ollama installed, mirror what its Image serializer does
+        messages[0]['images'] = [base64.b64encode(image_bytes).decode()]
+        payload = {'model': MODEL, 'messages': messages, 'stream': False}
+    # httpx json= dumps to str and encodes to bytes
+    return json.dumps(payload).encode('utf-8')
+
+
+def _read_bytes_path(image_path):
+    with open(image_path, 'rb') as image_file:
+        return _client_body(image_file.read())
+
+
+def _spliced_body(payload):
+    return build_chat_body(MODEL, [{'role': 'user', 'content': PROMPT, 'images': [payload]}])
+
+
+def _mmap_payload_path(image_path):
+    return _spliced_body(encode_image_file(image_path))
+
+
+def _measure(func, image_path, repeats):
+    """
+    Return (peak traced bytes, seconds per call) for func(image_path)
+    
+    Tracing starts before the first call, so buffers allocated on first use count.
+    """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(image_path)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return peak, elapsed / repeats
+
+
+def run_benchmark(image_paths, repeats=5):
+    """
+    Compare peak Python allocations per image for each way of building the request body
+    
+    Returns:
+        list: One dict per image with peak bytes and timings per path
+    """
+    rows = []
+    for image_path in image_paths:
+        size = os.path.getsize(image_path)
+        cache = ImagePayloadCache()
+        cache.get(image_path)
+        
+        paths = {
+            'read + ollama client': _read_bytes_path,
+            'mmap payload (cold)': _mmap_payload_path,
+            'cached payload': lambda p: _spliced_body(cache.get(p))
+        }
+        row = {'image': os.path.basename(image_path), 'file_bytes': size}
+        for name, func in paths.items():
+            peak, seconds = _measure(func, image_path, repeats)
+            row[name] = {
+                'peak_bytes': peak,
+                'peak_x_file_size': round(peak / size, 2) if size else None,
+                'ms_per_image': round(seconds * 1000, 2)
+            }
+        rows.append(row)
+    return rows
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python payload_benchmark.py IMAGE [IMAGE ...]")
+        sys.exit(1)
+    
+    print("🚀 Image Payload Benchmark")
+    print("=" * 40)
+    
+    for row in run_benchmark(sys.argv[1:]):
+        print(f"\n🖼️  {row['image']} ({row['file_bytes'] / 1024 / 1024:.1f} MB)")
+        for name, stats in row.items():
+            if isinstance(stats, dict):
+                print(f"   • {name:<22} peak {stats['peak_bytes'] / 1024 / 1024:8.2f} MB "
+                      f"({stats['peak_x_file_size']}x file) | {stats['ms_per_image']} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import os
+import sys
+import time
+import threading
+import traceback
+from collections import Counter
+from datetime import datetime
+
+DEFAULT_SAMPLE_INTERVAL = 0.01
+DEFAULT_STALL_THRESHOLD = 0.2
+# Top frames in these files (frame labels carry base names) mean the thread is parked, not using CPU
+IDLE_FILES = ('threading.py', 'queue.py', 'selectors.py', 'thread.py')
+
+
+def profiling_requested():
+    """Profiling is opt-in through FIBER_PROFILE=1"""
+    return os.environ.get('FIBER_PROFILE', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def memory_interval_from_env():
+    """Seconds between tracemalloc snapshots from FIBER_PROFILE_MEMORY_INTERVAL (None = off)"""
+    value = os.environ.get('FIBER_PROFILE_MEMORY_INTERVAL')
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RunProfiler:
+    def __init__(self, output_dir, run_name, cpu=True, memory_interval=None, top=20,
+                 sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        Opt-in CPU and memory profiling for one batch or GUI run
+        
+        The CPU profile is sampled from every thread (worker threads included,
+        which cProfile would miss) and written as a top-functions report plus
+        collapsed stacks usable with flamegraph tools. With memory_interval set,
+        tracemalloc snapshots are taken every memory_interval seconds and the
+        top allocation sites of each are reported.
+        
+        Args:
+            output_dir: Directory the reports are written to
+            run_name: Prefix for the report files
+            cpu: Sample CPU stacks
+            memory_interval: Seconds between tracemalloc snapshots (None = off)
+            top: Entries per report table
+            sample_interval: Seconds between CPU samples
+        """
+        self.output_dir = output_dir
+        self.run_name = run_name
+        self.cpu = cpu
+        self.memory_interval = memory_interval
+        self.top = top
+        self.sample_interval = sample_interval
+        
+        self._stop = threading.Event()
+        self._threads = []
+        self._stacks = Counter()
+        self._samples = 0
+        self._memory_snapshots = []
+        self._start_time = None
+    
+    def start(self):
+        self._start_time = time.time()
+        if self.cpu:
+            self._threads.append(threading.Thread(target=self._sample_cpu, name='fiber-profiler-cpu', daemon=True))
+        if self.memory_interval:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+            self._threads.append(threading.Thread(target=self._sample_memory, name='fiber-profiler-memory', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    def _sample_cpu(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or names.get(thread_id, '').startswith('fiber-profiler'):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                self._stacks[';'.join(reversed(labels))] += 1
+            self._samples += 1
+    
+    def _sample_memory(self):
+        import tracemalloc
+        while not self._stop.wait(self.memory_interval):
+            self._take_memory_snapshot(tracemalloc)
+    
+    def _take_memory_snapshot(self, tracemalloc):
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        self._memory_snapshots.append({
+            'elapsed_seconds': round(time.time() - self._start_time, 2),
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'top_sites': [(str(stat.traceback[0]), stat.size, stat.count)
+                          for stat in snapshot.statistics('lineno')[:self.top]]
+        })
+    
+    def stop(self):
+        """
+        Stop sampling and write the reports
+        
+        Returns:
+            dict: Paths of the written reports
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        
+        reports = {}
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.cpu:
+            reports.update(self._write_cpu_reports())
+        if self.memory_interval:
+            import tracemalloc
+            self._take_memory_snapshot(tracemalloc)  # final state
+            tracemalloc.stop()
+            reports['memory_report'] = self._write_memory_report()
+        return reports
+    
+    def _write_cpu_reports(self):
+        self_counts = Counter()
+        total_counts = Counter()
+        thread_counts = Counter()
+        busy_samples = 0
+        
+        for stack, count in self._stacks.items():
+            labels = stack.split(';')
+            thread_counts[labels[0]] += count
+            top = labels[-1]
+            if any(f"({idle}:" in top for idle in IDLE_FILES):
+                continue
+            busy_samples += count
+            self_counts[top] += count
+            for label in set(labels[1:]):
+                total_counts[label] += count
+        
+        elapsed = time.time() - self._start_time
+        report_path = os.path.join(self.output_dir, f"{self.run_name}_cpu_profile.txt")
+        stacks_path = os.path.join(self.output_dir, f"{self.run_name}_cpu_stacks.txt")
+        
+        with open(report_path, 'w') as f:
+            f.write(f"CPU profile: {self.run_name}\n")
+            f.write(f"Wall time: {elapsed:.1f}s, {self._samples} sampling rounds every "
+                    f"{self.sample_interval * 1000:.0f} ms\n")
+            f.write(f"Busy thread samples (excluding parked threads): {busy_samples}\n\n")
+            
+            f.write("Samples per thread:\n")
+            for name, count in thread_counts.most_common():
+                f.write(f"  {count:>8}  {name}\n")
+            
+            for title, counts in (("Top functions by self samples", self_counts),
+                                  ("Top functions by inclusive samples", total_counts)):
+                f.write(f"\n{title}:\n")
+                for label, count in counts.most_common(self.top):
+                    share = 100 * count / busy_samples if busy_samples else 0
+                    f.write(f"  {count:>8}  {share:5.1f}%  {label}\n")
+        
+        with open(stacks_path, 'w') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        
+        return {'cpu_report': report_path, 'cpu_stacks': stacks_path}
+    
+    def _write_memory_report(self):
+        report_path = os.path.join(self.output_dir, f"{self.run_name}_memory_profile.txt")
+        with open(report_path, 'w') as f:
+            f.write(f"tracemalloc snapshots: {self.run_name} (every {self.memory_interval}s)\n")
+            for snapshot in self._memory_snapshots:
+                f.write(f"\n[{snapshot['elapsed_seconds']}s] current {snapshot['current_bytes'] / 1024 / 1024:.1f} MB, "
+                        f"peak {snapshot['peak_bytes'] / 1024 / 1024:.1f} MB\n")
+                for site, size, count in snapshot['top_sites']:
+                    f.write(f"  {size / 1024:>10.1f} KB  {count:>7} blocks  {site}\n")
+        return report_path
+
+
+class TkStallDetector:
+    def __init__(self, root, log_path, threshold=DEFAULT_STALL_THRESHOLD, heartbeat_ms=50):
+        """
+        Log Tk callbacks that block the main loop longer than threshold seconds
+        
+        A heartbeat is scheduled on the Tk loop; a watchdog thread notices when
+        it stops beating and records the main thread's stack, which names the
+        callback that is holding up the UI.
+        
+        Args:
+            root: Tk root window
+            log_path: File the stall log is appended to
+            threshold: Seconds without a heartbeat that count as a stall
+            heartbeat_ms: Heartbeat period on the Tk loop
+        """
+        self.root = root
+        self.log_path = log_path
+        self.threshold = threshold
+        self.heartbeat_ms = heartbeat_ms
+        self.stalls = 0
+        
+        self._last_beat = time.time()
+        self._main_thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._in_stall = False
+        self._stall_length = 0.0
+    
+    def start(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+        self._beat()
+        threading.Thread(target=self._watch, name='fiber-profiler-tk-stalls', daemon=True).start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _beat(self):
+        self._last_beat = time.time()
+        if not self._stop.is_set():
+            self.root.after(self.heartbeat_ms, self._beat)
+    
+    def _watch(self):
+        while not self._stop.wait(self.threshold / 4):
+            blocked_for = time.time() - self._last_beat
+            if blocked_for < self.threshold:
+                if self._in_stall:
+                    self._in_stall = False
+                    with open(self.log_path, 'a') as f:
+                        f.write(f"  ... stall #{self.stalls} ended after about {self._stall_length * 1000:.0f} ms\n\n")
+                continue
+            self._stall_length = blocked_for
+            if self._in_stall:
+                continue  # already logged this stall
+            self._in_stall = True
+            self.stalls += 1
+            
+            frame = sys._current_frames().get(self._main_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else '  (main thread stack unavailable)\n'
+            with open(self.log_path, 'a') as f:
+                f.write(f"[{datetime.now().isoformat()}] Tk main loop blocked > {self.threshold * 1000:.0f} ms "
+                        f"(at {blocked_for * 1000:.0f} ms when sampled)\n{stack}")
+            print(f"⚠️  UI stall #{self.stalls}: main loop blocked {blocked_for * 1000:.0f} ms, logged to {self.log_path}")
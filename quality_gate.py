@@ -0,0 +1,232 @@
+import os
+import sys
+import time
+import threading
+import importlib.util
+
+# Images are judged on a grayscale copy this wide; thresholds below are relative to it
+ANALYSIS_WIDTH = 640
+
+# Laplacian variance relative to pixel variance (so it doesn't depend on how much of the
+# frame is blank paper, or how dark the photo is); below this is motion blur / out of focus
+DEFAULT_MIN_SHARPNESS = 0.25
+# Median brightness below this: lens cap, pocket, dark room
+DEFAULT_DARK_LEVEL = 40
+# Median brightness above this: washed out / pointed at a light (a white sheet is too, so
+# exposure and contrast only reject images in which no ink was found either)
+DEFAULT_BRIGHT_LEVEL = 225
+# Spread between the 0.5th and 99.5th brightness percentiles
+DEFAULT_MIN_CONTRAST = 30
+CONTRAST_PERCENTILE = 0.005
+# Share of pixels in ink strokes (pen strokes, printed digits); about one digit at ANALYSIS_WIDTH
+DEFAULT_MIN_INK_FRACTION = 0.0005
+# How much darker than the local background a pixel must be to count as ink
+INK_DELTA = 35
+# Connected ink smaller than this is texture or noise (floor, paper grain), not a stroke
+MIN_STROKE_PIXELS = 15
+# Sharpness is measured on the box around the ink strokes, widened by this much
+INK_MARGIN = 31
+
+REASON_CODES = {
+    'unreadable': "Image could not be decoded",
+    'too_dark': "Image is almost black",
+    'too_bright': "Image is washed out",
+    'low_contrast': "Image has almost no contrast",
+    'blurry': "Image is too blurred to read",
+    'no_ink': "No writing or print found (blank surface, floor, ...)",
+}
+
+
+def _decode_gray(image_path, image_data=None):
+    """Decode an image (file, archive member or bytes) to a small grayscale array, or None"""
+    import cv2
+    import numpy as np
+    
+    if image_data is None:
+        from archive_ingest import split_member_path, read_archive_member
+        if split_member_path(image_path)[1] is not None:
+            image_data = read_archive_member(image_path)
+    raw = np.frombuffer(image_data, dtype=np.uint8) if image_data is not None else np.fromfile(image_path, dtype=np.uint8)
+    
+    gray = cv2.imdecode(raw, cv2.IMREAD_REDUCED_GRAYSCALE_2) if raw.size else None
+    if gray is None and raw.size:
+        # GIF and other formats OpenCV can't read
+        try:
+            import io
+            from PIL import Image
+            with Image.open(io.BytesIO(raw.tobytes())) as image:
+                gray = np.asarray(image.convert('L'))
+        except Exception:
+            return None
+    if gray is None:
+        return None
+    
+    height, width = gray.shape[:2]
+    if width > ANALYSIS_WIDTH:
+        gray = cv2.resize(gray, (ANALYSIS_WIDTH, max(1, int(height * ANALYSIS_WIDTH / width))),
+                          interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def measure_quality(gray):
+    """
+    Blur, exposure, contrast and ink metrics of a grayscale image
+    
+    Returns:
+        dict: sharpness, brightness (median), contrast (0.5th-99.5th percentile spread)
+              and ink_fraction
+    """
+    import cv2
+    import numpy as np
+    
+    histogram = np.bincount(gray.ravel(), minlength=256)
+    cumulative = np.cumsum(histogram) / gray.size
+    low = int(np.searchsorted(cumulative, CONTRAST_PERCENTILE))
+    median = int(np.searchsorted(cumulative, 0.5))
+    high = int(np.searchsorted(cumulative, 1 - CONTRAST_PERCENTILE))
+    
+    # Ink: pixels well below a blurred copy of their neighbourhood, in stroke-sized blobs
+    background = cv2.blur(gray, (31, 31))
+    ink = (cv2.subtract(background, gray) > INK_DELTA).astype(np.uint8)
+    _, labels, blobs, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    strokes = np.flatnonzero(blobs[:, cv2.CC_STAT_AREA] >= MIN_STROKE_PIXELS)
+    strokes = strokes[strokes > 0]  # label 0 is the background
+    ink_fraction = float(blobs[strokes, cv2.CC_STAT_AREA].sum()) / gray.size
+    
+    # Sharpness around the writing when there is some: blank paper would average it away
+    region = gray
+    if strokes.size:
+        ys, xs = np.nonzero(np.isin(labels, strokes))
+        top, left = max(ys.min() - INK_MARGIN, 0), max(xs.min() - INK_MARGIN, 0)
+        region = gray[top:ys.max() + INK_MARGIN + 1, left:xs.max() + INK_MARGIN + 1]
+    region = region.astype(np.float32)
+    spread = float(region.var())
+    sharpness = float(cv2.Laplacian(region, cv2.CV_32F).var()) / spread if spread else 0.0
+    
+    return {
+        'sharpness': round(sharpness, 3),
+        'brightness': median,
+        'contrast': high - low,
+        'ink_fraction': round(ink_fraction, 4),
+    }
+
+
+class QualityGate:
+    def __init__(self, min_sharpness=DEFAULT_MIN_SHARPNESS, dark_level=DEFAULT_DARK_LEVEL,
+                 bright_level=DEFAULT_BRIGHT_LEVEL, min_contrast=DEFAULT_MIN_CONTRAST,
+                 min_ink_fraction=DEFAULT_MIN_INK_FRACTION):
+        """
+        Cheap pre-inference check that rejects images the model cannot read
+        
+        The default thresholds are starting points; run quality_gate.py on a
+        sample of your own photos before relying on them.
+        
+        Args:
+            min_sharpness: Lowest Laplacian variance accepted, relative to the pixel variance
+            dark_level: Reject inkless images with a median brightness below this
+            bright_level: Reject inkless images with a median brightness above this
+            min_contrast: Reject inkless images with a smaller 0.5th-99.5th percentile spread
+            min_ink_fraction: Lowest share of ink-like pixels accepted; images with at
+                              least this much ink are only checked for blur
+        """
+        # Fail at construction if OpenCV is missing, but only load it on the first check()
+        for module in ('cv2', 'numpy'):
+            if importlib.util.find_spec(module) is None:
+                raise ImportError(f"QualityGate needs {module} (pip install numpy opencv-python)")
+        
+        self.min_sharpness = min_sharpness
+        self.dark_level = dark_level
+        self.bright_level = bright_level
+        self.min_contrast = min_contrast
+        self.min_ink_fraction = min_ink_fraction
+        
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejected = {}
+        self.check_seconds = 0.0
+    
+    @classmethod
+    def from_settings(cls, settings):
+        """Build a gate from a dict of thresholds (unknown keys are ignored)"""
+        names = ('min_sharpness', 'dark_level', 'bright_level', 'min_contrast', 'min_ink_fraction')
+        return cls(**{name: settings[name] for name in names if name in settings})
+    
+    def verdict(self, metrics):
+        """
+        Reason code for metrics that fail a threshold, or None when the image passes
+        
+        Writing on a white sheet can be a tiny share of the pixels, so exposure
+        and contrast only count against an image in which no ink was found.
+        """
+        if metrics['ink_fraction'] < self.min_ink_fraction:
+            if metrics['brightness'] < self.dark_level:
+                return 'too_dark'
+            if metrics['brightness'] > self.bright_level:
+                return 'too_bright'
+            if metrics['contrast'] < self.min_contrast:
+                return 'low_contrast'
+        if metrics['sharpness'] < self.min_sharpness:
+            return 'blurry'
+        if metrics['ink_fraction'] < self.min_ink_fraction:
+            return 'no_ink'
+        return None
+    
+    def check(self, image_path, image_data=None):
+        """
+        Judge one image
+        
+        Returns:
+            tuple: (reason code or None, metrics dict)
+        """
+        start = time.perf_counter()
+        try:
+            gray = _decode_gray(image_path, image_data)
+        except Exception:
+            gray = None
+        if gray is None or gray.size == 0:
+            reason, metrics = 'unreadable', {}
+        else:
+            metrics = measure_quality(gray)
+            reason = self.verdict(metrics)
+        elapsed = time.perf_counter() - start
+        
+        with self._lock:
+            self.checked += 1
+            self.check_seconds += elapsed
+            if reason:
+                self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return reason, metrics
+    
+    def reset(self):
+        with self._lock:
+            self.checked = 0
+            self.rejected = {}
+            self.check_seconds = 0.0
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'checked': self.checked,
+                'skipped': sum(self.rejected.values()),
+                'reasons': dict(self.rejected),
+                'check_seconds': round(self.check_seconds, 3)
+            }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python quality_gate.py <image> [image ...]")
+        print("   Prints the quality metrics and verdict used to skip unreadable images")
+        return
+    
+    gate = QualityGate()
+    for path in sys.argv[1:]:
+        reason, metrics = gate.check(path)
+        verdict = f"❌ {reason}: {REASON_CODES[reason]}" if reason else "✅ ok"
+        print(f"{os.path.basename(path)}: {verdict}")
+        for name, value in metrics.items():
+            print(f"   {name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+import itertools
+import threading
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lower rank runs first
+PRIORITY_CLASSES = {'interactive': 0, 'batch': 1}
+PRIORITY_HEADER = 'X-Fiber-Priority'
+DEFAULT_BROKER_PORT = 11500
+
+
+class PriorityRequestScheduler:
+    def __init__(self, max_concurrent=2, reserved_interactive=1, stats_window=1000):
+        """
+        Shared priority queue in front of the Ollama server
+        
+        Queued interactive requests always run before queued batch requests, and
+        batch work may only occupy max_concurrent - reserved_interactive slots, so
+        an interactive request never waits behind a running batch request.
+        
+        Args:
+            max_concurrent: Requests sent to Ollama at once
+            reserved_interactive: Slots batch work may never take
+            stats_window: Number of recent samples kept per class for latency stats
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.reserved_interactive = min(max(0, reserved_interactive), self.max_concurrent - 1)
+        self.batch_limit = self.max_concurrent - self.reserved_interactive
+        
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._running = {name: 0 for name in PRIORITY_CLASSES}
+        self._stats = {
+            name: {'submitted': 0, 'completed': 0, 'failed': 0,
+                   'queue_wait': deque(maxlen=stats_window), 'service_time': deque(maxlen=stats_window)}
+            for name in PRIORITY_CLASSES
+        }
+        
+        for i in range(self.max_concurrent):
+            threading.Thread(target=self._worker, name=f"fiber-scheduler-{i}", daemon=True).start()
+    
+    def submit(self, func, *args, priority='batch', **kwargs):
+        """
+        Queue func(*args, **kwargs) in a priority class
+        
+        Returns:
+            concurrent.futures.Future: Cancelling it drops the request if it hasn't started
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        
+        future = Future()
+        with self._condition:
+            heapq.heappush(self._queue, (PRIORITY_CLASSES[priority], next(self._sequence),
+                                         time.time(), priority, future, func, args, kwargs))
+            self._stats[priority]['submitted'] += 1
+            self._condition.notify_all()
+        return future
+    
+    def _next_runnable(self):
+        """Pop the best queued request allowed to run now, or None"""
+        while self._queue:
+            rank, _, enqueued_at, priority, future, func, args, kwargs = self._queue[0]
+            if priority == 'batch' and self._running['batch'] >= self.batch_limit:
+                return None
+            heapq.heappop(self._queue)
+            if future.set_running_or_notify_cancel():
+                return enqueued_at, priority, future, func, args, kwargs
+        return None
+    
+    def _worker(self):
+        while True:
+            with self._condition:
+                item = self._next_runnable()
+                while item is None:
+                    self._condition.wait()
+                    item = self._next_runnable()
+                enqueued_at, priority, future, func, args, kwargs = item
+                self._running[priority] += 1
+            
+            started_at = time.time()
+            failed = False
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                failed = True
+                future.set_exception(e)
+            finished_at = time.time()
+            
+            with self._condition:
+                self._running[priority] -= 1
+                stats = self._stats[priority]
+                stats['completed'] += 1
+                stats['failed'] += failed
+                stats['queue_wait'].append(started_at - enqueued_at)
+                stats['service_time'].append(finished_at - started_at)
+                self._condition.notify_all()
+    
+    @staticmethod
+    def _percentiles(samples):
+        if not samples:
+            return {'p50': None, 'p95': None, 'max': None}
+        ordered = sorted(samples)
+        pick = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+        return {'p50': round(pick(50), 3), 'p95': round(pick(95), 3), 'max': round(ordered[-1], 3)}
+    
+    def stats(self):
+        """Per-class counts, queue depth and queueing/service latency (seconds)"""
+        with self._condition:
+            queued = {name: 0 for name in PRIORITY_CLASSES}
+            for item in self._queue:
+                queued[item[3]] += 1
+            return {
+                name: {
+                    'submitted': stats['submitted'],
+                    'completed': stats['completed'],
+                    'failed': stats['failed'],
+                    'queued': queued[name],
+                    'running': self._running[name],
+                    'queue_wait_seconds': self._percentiles(stats['queue_wait']),
+                    'service_time_seconds': self._percentiles(stats['service_time'])
+                }
+                for name, stats in self._stats.items()
+            }
+
+
+def _forward(upstream, path, body, content_type):
+    """POST body to the upstream Ollama server, returning (status, content_type, response bytes)"""
+    request = urllib.request.Request(upstream.rstrip('/') + path, data=body, method='POST',
+                                     headers={'Content-Type': content_type or 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers.get('Content-Type'), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get('Content-Type'), e.read()
+
+
+def make_broker_handler(scheduler, upstream):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/scheduler/stats':
+                self._send(200, 'application/json', json.dumps(scheduler.stats(), indent=2).encode('utf-8'))
+            else:
+                self._send(404, 'application/json', b'{"error": "not found"}')
+        
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            content_type = self.headers.get('Content-Type')
+            
+            if self.path != '/api/chat':
+                # Only inference is scheduled; anything else passes straight through
+                self._send(*_forward(upstream, self.path, body, content_type))
+                return
+            
+            priority = self.headers.get(PRIORITY_HEADER, 'batch').lower()
+            if priority not in PRIORITY_CLASSES:
+                priority = 'batch'
+            try:
+                response = scheduler.submit(_forward, upstream, self.path, body, content_type,
+                                            priority=priority).result()
+            except Exception as e:
+                response = (502, 'application/json', json.dumps({'error': f'upstream failed: {e}'}).encode('utf-8'))
+            self._send(*response)
+        
+        def _send(self, status, content_type, data):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type or 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return Handler
+
+
+def start_broker(upstream, host='127.0.0.1', port=DEFAULT_BROKER_PORT, max_concurrent=2, reserved_interactive=1):
+    """
+    Start the scheduling broker on a background thread
+    
+    Returns:
+        (httpd, url): Point detectors at url (or set FIBER_SCHEDULER_URL to it)
+    """
+    scheduler = PriorityRequestScheduler(max_concurrent, reserved_interactive)
+    httpd = ThreadingHTTPServer((host, port), make_broker_handler(scheduler, upstream))
+    httpd.scheduler = scheduler
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://{host}:{httpd.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local priority broker in front of Ollama. Start it once, then run the GUI and "
+                    "batch jobs with FIBER_SCHEDULER_URL=http://127.0.0.1:%d" % DEFAULT_BROKER_PORT)
+    parser.add_argument('--upstream', default=os.environ.get('OLLAMA_HOST', 'http://127.0.0.1:11434'),
+                        help="Ollama server URL (default: OLLAMA_HOST or http://127.0.0.1:11434)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_BROKER_PORT)
+    parser.add_argument('--max-concurrent', type=int, default=2, help="Requests sent to Ollama at once")
+    parser.add_argument('--reserved-interactive', type=int, default=1,
+                        help="Slots batch requests may never use")
+    args = parser.parse_args()
+    
+    upstream = args.upstream if '://' in args.upstream else f"http://{args.upstream}"
+    httpd, url = start_broker(upstream, args.host, args.port, args.max_concurrent, args.reserved_interactive)
+    scheduler = httpd.scheduler
+    
+    print(f"🚦 Fiber request broker on {url} → {upstream}")
+    print(f"   {scheduler.max_concurrent} concurrent requests, {scheduler.reserved_interactive} reserved for interactive")
+    print(f"   Stats: {url}/scheduler/stats")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        httpd.shutdown()
+        print(json.dumps(scheduler.stats(), indent=2))
+        print("👋 Stopped")
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
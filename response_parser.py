@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# First number in the reply is the reading (the optional "m" / " meters" after it doesn't change which)
+NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+BASE_CONFIDENCE = 50
+MEASUREMENT_TERMS = ('meter', 'meters', 'm', 'measurement', 'length', 'fiber')
+MEASUREMENT_BONUS = 10
+# Present alongside the detected number: it was given with a unit
+UNIT_TERMS = ('m', 'meter')
+UNIT_BONUS = 20
+CERTAINTY_WORDS = ('clearly', 'shows', 'reads', 'indicates', 'visible')
+CERTAINTY_BONUS = 5
+UNCERTAINTY_WORDS = ('might', 'appears', 'seems', 'possibly', 'unclear')
+UNCERTAINTY_PENALTY = 10
+
+
+def score_confidence(model_output, detected_value, lowered=None):
+    """
+    Confidence (0-100) of a reading from the wording of the model's reply
+    
+    Same heuristic as FiberLengthDetector always used, but the reply is
+    lower-cased once instead of once per term.
+    
+    Args:
+        model_output: Raw model reply
+        detected_value: The reading taken from it
+        lowered: model_output.lower(), when the caller already has it
+    """
+    if lowered is None:
+        lowered = model_output.lower()
+    
+    confidence = BASE_CONFIDENCE
+    for term in MEASUREMENT_TERMS:
+        if term in lowered:
+            confidence += MEASUREMENT_BONUS
+            break
+    if str(detected_value) in model_output:
+        for term in UNIT_TERMS:
+            if term in lowered:
+                confidence += UNIT_BONUS
+                break
+    for word in CERTAINTY_WORDS:
+        if word in lowered:
+            confidence += CERTAINTY_BONUS
+    for word in UNCERTAINTY_WORDS:
+        if word in lowered:
+            confidence -= UNCERTAINTY_PENALTY
+    
+    return max(0, min(100, confidence))
+
+
+def parse_response(content):
+    """
+    Reading, unit, confidence and other numbers from a model reply
+    
+    One lower-cased copy and one precompiled number scan per reply.
+    
+    Returns:
+        dict: detected_length, unit, confidence, additional_numbers
+    """
+    lowered = content.lower()
+    numbers = NUMBER.findall(lowered)
+    
+    if not numbers:
+        return {'detected_length': None, 'unit': 'N/A', 'confidence': BASE_CONFIDENCE, 'additional_numbers': []}
+    
+    detected_length = float(numbers[0])
+    return {
+        'detected_length': detected_length,
+        'unit': 'meters',
+        'confidence': score_confidence(content, detected_length, lowered),
+        'additional_numbers': [float(number) for number in numbers[1:]]
+    }
+
+
+def _parse_chunk(texts):
+    """Worker entry point: parse a list of replies"""
+    return [parse_response(text) for text in texts]
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_many(texts, workers=None, chunk_size=2000, executor=None):
+    """
+    Parse a list or stream of model replies, in order, across processes
+    
+    Only a few chunks per worker are in flight at a time, so an unbounded
+    stream (e.g. a database cursor) is processed in constant memory.
+    
+    Args:
+        texts: Iterable of raw model replies
+        workers: Worker processes (default: CPU count; 1 parses in this process)
+        chunk_size: Replies sent to a worker at a time
+        executor: ProcessPoolExecutor of workers processes to reuse across calls
+                  (default: one is started and shut down for this call)
+    
+    Yields:
+        dict: parse_response() result for each reply
+    """
+    workers = workers or os.cpu_count() or 1
+    if executor is None:
+        if workers == 1:
+            for text in texts:
+                yield parse_response(text)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from parse_many(texts, workers, chunk_size, executor)
+        return
+    
+    pending = []
+    for chunk in _chunks(texts, chunk_size):
+        pending.append(executor.submit(_parse_chunk, chunk))
+        if len(pending) >= workers * 2:
+            yield from pending.pop(0).result()
+    for future in pending:
+        yield from future.result()
+
+
+def _start_pool(workers):
+    """One ProcessPoolExecutor for a whole re-scoring run, or None when parsing in this process"""
+    workers = workers or os.cpu_count() or 1
+    return ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+
+def rescore_results(results, workers=None, chunk_size=2000):
+    """
+    Re-parse stored results from their raw_text with the current heuristics
+    
+    Results without raw_text, or produced by voting, tiling or video fusion
+    (whose raw_text is not a single reply), are passed through unchanged.
+    
+    Yields:
+        dict: Each result, updated in place when it was re-scored
+    """
+    pending = []
+    executor = _start_pool(workers)
+    
+    def flush():
+        parsed = parse_many([result['raw_text'] for result in pending], workers, chunk_size, executor)
+        for result, fields in zip(pending, parsed):
+            result.update(fields)
+            yield result
+        pending.clear()
+    
+    try:
+        for result in results:
+            if result.get('method') == 'Ollama Model' and result.get('raw_text') and 'error' not in result:
+                pending.append(result)
+                if len(pending) >= chunk_size * (workers or os.cpu_count() or 1) * 4:
+                    yield from flush()
+            elif pending:
+                # Keep the input order
+                yield from flush()
+                yield result
+            else:
+                yield result
+        if pending:
+            yield from flush()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def rescore_store(store, workers=None, batch_size=50000, chunk_size=2000):
+    """
+    Re-score every single-reply reading in a ResultsStore in place
+    
+    Readings are streamed in id order and updated batch by batch; one pool
+    of worker processes parses all batches.
+    
+    Returns:
+        dict: rows seen, rows whose parsed fields changed, seconds taken
+    """
+    start = time.perf_counter()
+    seen = changed = 0
+    executor = _start_pool(workers)
+    
+    try:
+        for batch in store.iter_results(method='Ollama Model', batch_size=batch_size):
+            parsed = parse_many([result.get('raw_text') or '' for _, result in batch], workers, chunk_size, executor)
+            updates = []
+            for (reading_id, result), fields in zip(batch, parsed):
+                seen += 1
+                if all(result.get(name) == value for name, value in fields.items()):
+                    continue
+                result.update(fields)
+                updates.append((reading_id, result))
+            changed += store.update_results(updates)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    return {'rows': seen, 'changed': changed, 'seconds': round(time.perf_counter() - start, 2)}
+
+
+def main():
+    from results_store import ResultsStore, DEFAULT_STORE
+    
+    parser = argparse.ArgumentParser(description="Re-score stored model replies with the current heuristics")
+    parser.add_argument('inputs', nargs='*', help="Results JSON files to re-score (written back in place)")
+    parser.add_argument('--db', help=f"Re-score a results store instead (e.g. {DEFAULT_STORE})")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    
+    if args.db:
+        store = ResultsStore(args.db)
+        stats = rescore_store(store, args.workers)
+        store.close()
+        print(f"✅ {args.db}: {stats['changed']} of {stats['rows']} readings changed in {stats['seconds']}s")
+    
+    for path in args.inputs:
+        with open(path) as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or 'results' not in data:
+            print(f"⚠️  {path}: no results list")
+            continue
+        start = time.perf_counter()
+        data['results'] = list(rescore_results(data['results'], args.workers))
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+        print(f"✅ {path}: {len(data['results'])} results re-scored in {time.perf_counter() - start:.2f}s")
+    
+    if not args.db and not args.inputs:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+import os
+import re
+import glob
+import json
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from archive_ingest import display_name
+
+# One store for every run, wherever the CLI or GUI was started from: next to this module
+# unless FIBER_RESULTS_DB points elsewhere (give it an absolute path)
+DEFAULT_STORE = os.path.expanduser(os.environ.get('FIBER_RESULTS_DB') or
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fiber_results.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    source TEXT,
+    input_path TEXT,
+    recorded_at TEXT NOT NULL,
+    summary TEXT
+);
+CREATE TABLE IF NOT EXISTS readings (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    filepath TEXT NOT NULL,
+    filename TEXT NOT NULL COLLATE NOCASE,
+    frame INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT,
+    detected_length REAL,
+    unit TEXT,
+    confidence REAL,
+    status TEXT NOT NULL,
+    model TEXT,
+    method TEXT,
+    processed_at TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_readings_filename ON readings (filename, processed_at);
+CREATE INDEX IF NOT EXISTS idx_readings_content_hash ON readings (content_hash);
+CREATE INDEX IF NOT EXISTS idx_readings_detected_length ON readings (detected_length);
+CREATE INDEX IF NOT EXISTS idx_readings_confidence ON readings (confidence, processed_at);
+CREATE INDEX IF NOT EXISTS idx_readings_processed_at ON readings (processed_at);
+-- The same reading imported twice is stored once
+CREATE UNIQUE INDEX IF NOT EXISTS idx_readings_identity ON readings (filepath, frame, processed_at);
+"""
+
+READING_COLUMNS = ('id', 'run_id', 'filepath', 'filename', 'frame', 'content_hash', 'detected_length',
+                   'unit', 'confidence', 'status', 'model', 'method', 'processed_at')
+
+
+def _number(value):
+    """float for numeric values, None for 'Not detected', 'N/A', ..."""
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _status(result):
+    if result.get('skipped'):
+        return 'skipped'
+    if 'error' in result:
+        return 'error'
+    return 'detected' if _number(result.get('detected_length')) is not None else 'not_detected'
+
+
+def parse_time(text, now=None):
+    """
+    Parse a query time bound
+    
+    Accepts ISO dates/times ("2026-09-01", "2026-09-01T08:00"), "today",
+    "yesterday" or a relative age ("7d", "12h", "30m").
+    """
+    now = now or datetime.now()
+    text = text.strip().lower()
+    if text == 'today':
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if text == 'yesterday':
+        return now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([dhm])', text)
+    if match:
+        units = {'d': 'days', 'h': 'hours', 'm': 'minutes'}
+        return now - timedelta(**{units[match.group(2)]: float(match.group(1))})
+    return datetime.fromisoformat(text)
+
+
+def records_from_output(data, fallback_time=None):
+    """
+    Pull per-image result dicts out of any output this project writes
+    
+    Understands batch/tiled summaries ("results"), job queue exports, pair runs
+    ("image_results"), the GUI's dual-image result and single results that
+    carry a filepath.
+    
+    Returns:
+        tuple: (list of result dicts, run timestamp or None)
+    """
+    summary = data.get('processing_summary', {}) if isinstance(data, dict) else {}
+    run_time = summary.get('processed_at') or fallback_time
+    records = []
+    
+    if isinstance(data, list):
+        records = [r for r in data if isinstance(r, dict)]
+    elif 'results' in data:
+        records = list(data['results'])
+    elif 'image_results' in data:
+        records = [dict(result or {}, filepath=path) for path, result in data['image_results'].items()]
+    elif 'image1_result' in data:
+        for index in ('1', '2'):
+            result = data.get(f'image{index}_result')
+            if result:
+                records.append(dict(result, filepath=data.get(f'image{index}_path')))
+    elif 'filepath' in data:
+        records = [data]
+    
+    return [r for r in records if r.get('filepath')], run_time
+
+
+class ResultsStore:
+    def __init__(self, db_path=DEFAULT_STORE):
+        """
+        Indexed SQLite store of every reading from every run
+        
+        Lookups by filename, content hash, length, confidence and processing
+        time are served from indexes, so they stay fast with millions of rows.
+        
+        Args:
+            db_path: SQLite database file (default: FIBER_RESULTS_DB or fiber_results.db next to this module)
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+    
+    def close(self):
+        self.connection.close()
+    
+    def record_run(self, results, kind='batch', source=None, input_path=None, summary=None, default_time=None):
+        """
+        Store the results of one run
+        
+        Args:
+            results: Result dicts with at least a filepath
+            kind: 'batch', 'tiled', 'pairs', 'gui', 'queue', 'import', ...
+            source: File the results were written to or imported from
+            input_path: Directory or archive that was processed
+            summary: processing_summary of the run
+            default_time: processed_at for results without one (default: now)
+        
+        Returns:
+            int: Number of new readings (already stored readings are skipped)
+        """
+        recorded_at = datetime.now().isoformat()
+        default_time = default_time or recorded_at
+        
+        with self.connection:
+            run_id = self.connection.execute(
+                'INSERT INTO runs (kind, source, input_path, recorded_at, summary) VALUES (?, ?, ?, ?, ?)',
+                (kind, source, input_path, recorded_at, json.dumps(summary) if summary else None)
+            ).lastrowid
+            
+            before = self.connection.total_changes
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO readings (run_id, filepath, filename, frame, content_hash, detected_length, '
+                'unit, confidence, status, model, method, processed_at, result) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    (run_id, r['filepath'], r.get('filename') or display_name(r['filepath']), r.get('frame', 0),
+                     r.get('content_hash'), _number(r.get('detected_length')), r.get('unit'),
+                     _number(r.get('confidence')), _status(r), r.get('model_used'), r.get('method'),
+                     r.get('processed_at') or default_time, json.dumps(r))
+                    for r in results
+                )
+            )
+            inserted = self.connection.total_changes - before
+            
+            if not inserted:
+                # Nothing new (e.g. a re-import): don't keep an empty run
+                self.connection.execute('DELETE FROM runs WHERE id = ?', (run_id,))
+        return inserted
+    
+    def import_json(self, json_path):
+        """
+        Import a results JSON written by this project (batch, tiled, pairs, job queue export, GUI save)
+        
+        Returns:
+            int: Number of new readings
+        """
+        with open(json_path) as f:
+            data = json.load(f)
+        
+        fallback_time = datetime.fromtimestamp(os.path.getmtime(json_path)).isoformat()
+        records, run_time = records_from_output(data, fallback_time)
+        summary = data.get('processing_summary') if isinstance(data, dict) else None
+        input_path = summary.get('input_directory') if summary else None
+        return self.record_run(records, kind='import', source=os.path.abspath(json_path),
+                               input_path=input_path, summary=summary, default_time=run_time)
+    
+    def iter_results(self, method=None, batch_size=50000):
+        """
+        Stream stored result dicts in id order, batch by batch (error results are left out)
+        
+        Args:
+            method: Only results produced by this method (e.g. 'Ollama Model')
+            batch_size: Rows read per query
+        
+        Yields:
+            list: (reading id, result dict) pairs
+        """
+        condition = 'AND method = ?' if method else ''
+        last_id = 0
+        while True:
+            rows = self.connection.execute(
+                f"SELECT id, result FROM readings WHERE id > ? AND status != 'error' {condition} ORDER BY id LIMIT ?",
+                (last_id,) + ((method,) if method else ()) + (batch_size,)
+            ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1]['id']
+            yield [(row['id'], json.loads(row['result'])) for row in rows]
+    
+    def update_results(self, updates):
+        """
+        Replace stored result dicts (e.g. after re-scoring), refreshing the indexed columns from them
+        
+        Args:
+            updates: (reading id, result dict) pairs
+        
+        Returns:
+            int: Number of readings updated
+        """
+        with self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                'UPDATE readings SET detected_length = ?, unit = ?, confidence = ?, status = ?, result = ? WHERE id = ?',
+                (
+                    (_number(r.get('detected_length')), r.get('unit'), _number(r.get('confidence')), _status(r),
+                     json.dumps(r), reading_id)
+                    for reading_id, r in updates
+                )
+            )
+            return self.connection.total_changes - before
+    
+    def query(self, filename=None, content_hash=None, min_length=None, max_length=None,
+              min_confidence=None, max_confidence=None, since=None, until=None, status=None,
+              latest_only=False, limit=100, include_result=False):
+        """
+        Find stored readings, newest first
+        
+        Args:
+            filename: Exact name or pattern with * / ? wildcards, case-insensitive
+                      ("reel4711*" uses the index; a leading wildcard scans)
+            content_hash: SHA-256 of the image bytes
+            min_length / max_length: Detected length range in meters
+            min_confidence / max_confidence: Confidence range in percent (max is exclusive)
+            since / until: datetime or ISO string bounds on processed_at
+            status: 'detected', 'not_detected', 'error' or 'skipped'
+            latest_only: Only the newest reading of each file
+            limit: Most rows returned (None = all)
+            include_result: Also return the full stored result dict
+        
+        Returns:
+            list: One dict per reading
+        """
+        conditions = []
+        params = []
+        
+        if filename:
+            if any(char in filename for char in '*?'):
+                conditions.append("filename LIKE ? ESCAPE '\\'")
+                escaped = filename.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                params.append(escaped.replace('*', '%').replace('?', '_'))
+            else:
+                conditions.append('filename = ?')
+                params.append(filename)
+        if content_hash:
+            conditions.append('content_hash = ?')
+            params.append(content_hash)
+        for column, operator, value in (('detected_length', '>=', min_length), ('detected_length', '<=', max_length),
+                                        ('confidence', '>=', min_confidence), ('confidence', '<', max_confidence)):
+            if value is not None:
+                conditions.append(f'{column} {operator} ?')
+                params.append(float(value))
+        for operator, value in (('>=', since), ('<', until)):
+            if value is not None:
+                conditions.append(f'processed_at {operator} ?')
+                params.append(value.isoformat() if isinstance(value, datetime) else str(value))
+        if status:
+            conditions.append('status = ?')
+            params.append(status)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        columns = ', '.join(READING_COLUMNS + (('result',) if include_result else ()))
+        sql = f'SELECT {columns} FROM readings {where}'
+        if latest_only:
+            sql = (f'SELECT {columns} FROM ({sql}) AS matching WHERE processed_at = '
+                   f'(SELECT MAX(processed_at) FROM readings AS newer WHERE newer.filepath = matching.filepath '
+                   f'AND newer.frame = matching.frame)')
+        sql += ' ORDER BY processed_at DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        
+        rows = []
+        for row in self.connection.execute(sql, params):
+            reading = dict(row)
+            if include_result:
+                reading['result'] = json.loads(reading['result'])
+            rows.append(reading)
+        return rows
+    
+    def stats(self):
+        counts = self.connection.execute(
+            'SELECT COUNT(*) AS readings, COUNT(DISTINCT filepath) AS files, '
+            'MIN(processed_at) AS first, MAX(processed_at) AS last FROM readings').fetchone()
+        return {
+            'runs': self.connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0],
+            'readings': counts['readings'],
+            'files': counts['files'],
+            'first_processed_at': counts['first'],
+            'last_processed_at': counts['last'],
+            'database': os.path.abspath(self.db_path)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query and fill the fiber results store")
+    parser.add_argument('--db', default=DEFAULT_STORE, help=f"Results database (default: {DEFAULT_STORE})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    importer = commands.add_parser('import', help="Import results JSON files (directories are searched recursively)")
+    importer.add_argument('paths', nargs='+')
+    
+    query = commands.add_parser('query', help="Find readings, newest first")
+    query.add_argument('--file', help="File name or pattern, e.g. 'reel4711*'")
+    query.add_argument('--hash', help="SHA-256 of the image")
+    query.add_argument('--min-length', type=float)
+    query.add_argument('--max-length', type=float)
+    query.add_argument('--min-confidence', type=float)
+    query.add_argument('--max-confidence', type=float, help="Readings below this confidence")
+    query.add_argument('--since', help="ISO date/time, today, yesterday or an age like 7d / 12h")
+    query.add_argument('--until', help="Same formats as --since")
+    query.add_argument('--status', choices=['detected', 'not_detected', 'error', 'skipped'])
+    query.add_argument('--latest', action='store_true', help="Only the newest reading of each file")
+    query.add_argument('--limit', type=int, default=50)
+    query.add_argument('--json', action='store_true', help="Print full results as JSON")
+    
+    commands.add_parser('stats', help="Show store totals")
+    
+    args = parser.parse_args()
+    store = ResultsStore(args.db)
+    
+    if args.command == 'import':
+        total = 0
+        for path in args.paths:
+            files = sorted(glob.glob(os.path.join(path, '**', '*.json'), recursive=True)) if os.path.isdir(path) else [path]
+            for json_path in files:
+                try:
+                    added = store.import_json(json_path)
+                except Exception as e:
+                    print(f"   ⚠️  {json_path}: {e}")
+                    continue
+                total += added
+                print(f"   📥 {json_path}: {added} new reading(s)")
+        print(f"✅ Imported {total} reading(s) into {args.db}")
+    
+    elif args.command == 'query':
+        start = time.perf_counter()
+        rows = store.query(
+            filename=args.file, content_hash=args.hash, min_length=args.min_length, max_length=args.max_length,
+            min_confidence=args.min_confidence, max_confidence=args.max_confidence,
+            since=parse_time(args.since) if args.since else None, until=parse_time(args.until) if args.until else None,
+            status=args.status, latest_only=args.latest, limit=args.limit, include_result=args.json
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            for row in rows:
+                length = f"{row['detected_length']:g} {row['unit'] or ''}" if row['detected_length'] is not None else row['status']
+                confidence = f"{row['confidence']:.0f}%" if row['confidence'] is not None else '-'
+                print(f"   {row['processed_at'][:19]}  {row['filename']:<40} {length:<16} {confidence:>5}")
+            print(f"🔍 {len(rows)} reading(s) in {elapsed_ms:.1f} ms")
+    
+    elif args.command == 'stats':
+        for name, value in store.stats().items():
+            print(f"   {name}: {value}")
+    
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandInOllamaServer:
+    def __init__(self, script, image_dir=None):
+        """
+        Minimal Ollama /api/chat stand-in with scripted per-model behavior
+        
+        Script format:
+            {"models": {"<model>": {
+                "latency_seconds": 0.5,         # fixed delay per request
+                "latency_jitter_seconds": 0.1,  # extra uniform random delay
+                "parallel": 4,                  # requests served at once, the rest queue
+                "error_rate": 0.0,              # fraction of requests answered with HTTP 500
+                "responses": {"<filename or sha256>": "model text" or ["one", "of", "these"]},
+                "default_response": "I cannot read the number."
+            }}}
+        
+        Args:
+            script: Parsed script dict
+            image_dir: Directory whose files may be referenced by filename in "responses"
+        """
+        self.models = script.get('models', {})
+        self.filenames_by_hash = {}
+        if image_dir:
+            for name in os.listdir(image_dir):
+                path = os.path.join(image_dir, name)
+                if os.path.isfile(path):
+                    with open(path, 'rb') as f:
+                        self.filenames_by_hash[hashlib.sha256(f.read()).hexdigest()] = name
+        self.request_counts = {}
+        # Like OLLAMA_NUM_PARALLEL: excess requests wait for a slot
+        self.slots = {
+            name: threading.Semaphore(behavior['parallel'])
+            for name, behavior in self.models.items() if behavior.get('parallel')
+        }
+    
+    def respond(self, model_name, image_bytes):
+        """Return (status_code, payload) for one chat request"""
+        behavior = self.models.get(model_name)
+        if behavior is None:
+            return 404, {'error': f"model '{model_name}' not found"}
+        
+        self.request_counts[model_name] = self.request_counts.get(model_name, 0) + 1
+        
+        delay = behavior.get('latency_seconds', 0.0) + random.uniform(0, behavior.get('latency_jitter_seconds', 0.0))
+        slot = self.slots.get(model_name)
+        if slot:
+            with slot:
+                time.sleep(delay)
+        elif delay > 0:
+            time.sleep(delay)
+        
+        if random.random() < behavior.get('error_rate', 0.0):
+            return 500, {'error': 'scripted failure'}
+        
+        responses = behavior.get('responses', {})
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        content = responses.get(digest)
+        if content is None:
+            content = responses.get(self.filenames_by_hash.get(digest, ''))
+        if content is None:
+            content = behavior.get('default_response', 'I cannot read the number.')
+        if isinstance(content, list):
+            content = random.choice(content)
+        
+        return 200, {
+            'model': model_name,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'message': {'role': 'assistant', 'content': content},
+            'done': True,
+            'done_reason': 'stop'
+        }
+
+
+def make_handler(server_state):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != '/api/chat':
+                self._send(404, {'error': 'not found'})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                images = body['messages'][-1].get('images') or []
+                image_bytes = base64.b64decode(images[0]) if images else b''
+            except Exception as e:
+                self._send(400, {'error': f'bad request: {e}'})
+                return
+            status, payload = server_state.respond(body.get('model'), image_bytes)
+            self._send(status, payload)
+        
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def log_message(self, format, *args):
+            pass  # keep benchmark output readable
+    
+    return Handler
+
+
+def start_server(script, image_dir=None, host='127.0.0.1', port=0):
+    """
+    Start the stand-in server on a background thread
+    
+    Returns:
+        (httpd, url): Call httpd.shutdown() when done; url can be passed as the detector host
+    """
+    state = StandInOllamaServer(script, image_dir)
+    httpd = ThreadingHTTPServer((host, port), make_handler(state))
+    httpd.state = state
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://{host}:{httpd.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scripted stand-in for the Ollama chat API")
+    parser.add_argument('script', help="JSON script with per-model behavior")
+    parser.add_argument('--image-dir', help="Directory of images referenced by filename in the script")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    args = parser.parse_args()
+    
+    with open(args.script, 'r') as f:
+        script = json.load(f)
+    
+    state = StandInOllamaServer(script, args.image_dir)
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"🧪 Stand-in Ollama server on http://{args.host}:{args.port}")
+    print(f"   Models: {', '.join(state.models) or 'none'}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Stopped")
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import subprocess
+
+# Each probe runs in a fresh interpreter so module caches don't hide the cost
+IMPORT_PROBE = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+WINDOW_PROBE = """
+import time
+start = time.perf_counter()
+import tkinter as tk
+from fiber_detector_gui import EnhancedFiberDetectorGUI
+
+root = tk.Tk()
+app = EnhancedFiberDetectorGUI(root)
+
+def on_painted():
+    print(time.perf_counter() - start)
+    root.destroy()
+
+# First idle callback after the main loop starts = window has been drawn
+root.after(0, lambda: root.after_idle(on_painted))
+root.mainloop()
+"""
+
+HEAVY_MODULES = ['ollama', 'httpx', 'PIL', 'cv2', 'numpy']
+
+
+def _run_probe(code, cwd):
+    """Run a probe script in a fresh interpreter and return its printed timing"""
+    output = subprocess.run([sys.executable, '-c', code], cwd=cwd,
+                            capture_output=True, text=True, timeout=120)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else 'probe failed')
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def _loaded_heavy_modules(module, cwd):
+    """Which heavy dependencies get pulled in just by importing module"""
+    code = (f"import sys, json\nimport {module}\n"
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=cwd,
+                            capture_output=True, text=True, timeout=120)
+    if output.returncode != 0:
+        return None
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def _summarize(samples):
+    samples = sorted(samples)
+    return {
+        'min_ms': round(samples[0] * 1000, 1),
+        'median_ms': round(samples[len(samples) // 2] * 1000, 1),
+        'max_ms': round(samples[-1] * 1000, 1)
+    }
+
+
+def run_benchmark(runs=5, include_window=True):
+    """
+    Measure cold import time of the entry points and GUI time-to-window
+    
+    Args:
+        runs: Number of fresh interpreters per measurement
+        include_window: Also measure time until the GUI window is painted
+        
+    Returns:
+        dict: Timing summary per measurement
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    report = {}
+    
+    for module in ['fiber_detector', 'batch_processor', 'fiber_detector_gui']:
+        print(f"⏱️  Import time: {module}")
+        try:
+            samples = [_run_probe(IMPORT_PROBE.format(module=module), cwd) for _ in range(runs)]
+            report[f'import {module}'] = _summarize(samples)
+            report[f'import {module}']['heavy_modules_loaded'] = _loaded_heavy_modules(module, cwd)
+        except Exception as e:
+            report[f'import {module}'] = {'error': str(e)}
+    
+    if include_window:
+        print("⏱️  Time to window: fiber_detector_gui")
+        try:
+            samples = [_run_probe(WINDOW_PROBE, cwd) for _ in range(runs)]
+            report['gui time-to-window'] = _summarize(samples)
+        except Exception as e:
+            report['gui time-to-window'] = {'error': str(e)}
+    
+    return report
+
+
+def main():
+    print("🚀 Fiber Detector Startup Benchmark")
+    print("=" * 40)
+    
+    include_window = '--no-window' not in sys.argv
+    report = run_benchmark(include_window=include_window)
+    
+    print(f"\n{'='*60}")
+    print("📊 STARTUP BENCHMARK RESULTS")
+    print(f"{'='*60}")
+    for name, stats in report.items():
+        if 'error' in stats:
+            print(f"   • {name}: ❌ {stats['error']}")
+        else:
+            heavy = stats.get('heavy_modules_loaded')
+            heavy_text = f" | heavy modules: {', '.join(heavy) or 'none'}" if heavy is not None else ""
+            print(f"   • {name}: median {stats['median_ms']} ms "
+                  f"(min {stats['min_ms']}, max {stats['max_ms']}){heavy_text}")
+    
+    if '--json' in sys.argv:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
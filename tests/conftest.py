@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def stand_in():
+    """Start stand-in Ollama servers from scripts; all are shut down after the test"""
+    from stand_in_server import start_server
+    servers = []
+    
+    def start(script, image_dir=None):
+        httpd, url = start_server(script, image_dir)
+        servers.append(httpd)
+        return httpd, url
+    
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def ollama_client():
+    """Skip tests that talk to a (stand-in) server when the client libraries are missing"""
+    pytest.importorskip('httpx')
+    pytest.importorskip('ollama')
+
+
+@pytest.fixture
+def images(tmp_path):
+    """A directory of small distinct image files (the stand-in server never decodes them)"""
+    image_dir = tmp_path / 'images'
+    image_dir.mkdir()
+    for i in range(4):
+        (image_dir / f'img{i}.jpg').write_bytes(b'\xff\xd8\xff\xe0' + os.urandom(64))
+    return image_dir
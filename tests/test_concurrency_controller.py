@@ -0,0 +1,84 @@
+import threading
+
+from concurrency_controller import AdaptiveConcurrencyLimiter
+
+
+def run_requests(limiter, count, latency=0.1, failed=False):
+    for _ in range(count):
+        limiter.acquire()
+        limiter.release(latency, failed)
+
+
+def test_release_without_latency_returns_the_slot_without_learning():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+    limiter.acquire()
+    
+    limiter.release(None)
+    
+    assert limiter.in_flight == 0
+    assert limiter.limit == 2
+    summary = limiter.summary()
+    assert summary['completed_requests'] == 0
+    assert summary['baseline_latency_seconds'] is None
+
+
+def test_limit_grows_about_one_per_window_at_steady_latency():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=16)
+    
+    run_requests(limiter, 3)
+    assert limiter.limit == 3
+    run_requests(limiter, 3)
+    assert limiter.limit == 4
+
+
+def test_limit_never_exceeds_max():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=3)
+    
+    run_requests(limiter, 50)
+    
+    assert limiter.limit == 3
+
+
+def test_errors_cut_the_limit_once_per_window():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, backoff_ratio=0.5)
+    
+    run_requests(limiter, 8, failed=True)
+    assert limiter.limit == 4
+    # The next cut needs a full window of the new limit
+    run_requests(limiter, 3, failed=True)
+    assert limiter.limit == 4
+    run_requests(limiter, 1, failed=True)
+    assert limiter.limit == 2
+    assert limiter.summary()['failed_requests'] == 12
+
+
+def test_queueing_latency_backs_off_gently():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, latency_tolerance=1.5,
+                                         latency_backoff_ratio=0.5, smoothing=1.0)
+    run_requests(limiter, 4, latency=0.1)
+    grown = limiter.limit
+    
+    run_requests(limiter, grown, latency=0.5)
+    
+    assert limiter.limit < grown
+    assert any(entry['event'] == 'decrease (latency)' for entry in limiter.summary()['limit_history'])
+
+
+def test_acquire_waits_for_a_released_slot():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+    limiter.acquire()
+    acquired = threading.Event()
+    
+    def second_request():
+        limiter.acquire()
+        acquired.set()
+    
+    thread = threading.Thread(target=second_request)
+    thread.start()
+    assert not acquired.wait(0.2)
+    
+    limiter.release(0.1)
+    assert acquired.wait(2)
+    thread.join()
+    assert limiter.in_flight == 1
+    assert limiter.summary()['peak_in_flight'] == 1
@@ -0,0 +1,146 @@
+import sqlite3
+import time
+
+import pytest
+
+import job_queue
+from archive_ingest import absolute_path
+from job_queue import JobQueue, RETRY_BASE_SECONDS
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), max_attempts=3)
+    yield queue
+    queue.close()
+
+
+def test_enqueue_ignores_files_already_queued(queue):
+    assert queue.enqueue(['/scans/a.jpg', '/scans/b.jpg']) == 2
+    assert queue.enqueue(['/scans/b.jpg', '/scans/c.jpg']) == 1
+    assert queue.status()['pending'] == 3
+
+
+def test_lease_then_complete(queue):
+    queue.enqueue(['/scans/a.jpg'])
+    
+    job = queue.lease('w1')
+    assert job['filepath'] == absolute_path('/scans/a.jpg')
+    assert job['attempts'] == 1
+    assert queue.lease('w2') is None  # the only job is leased
+    
+    assert queue.complete(job['id'], 'w1', {'detected_length': 120.0})
+    status = queue.status()
+    assert (status['done'], status['leased'], status['pending']) == (1, 0, 0)
+
+
+def test_complete_by_a_worker_that_lost_the_lease_is_ignored(queue):
+    queue.enqueue(['/scans/a.jpg'])
+    job = queue.lease('w1')
+    
+    assert not queue.complete(job['id'], 'w2', {})
+    assert not queue.fail(job['id'], 'w2', 'boom')
+    assert queue.status()['leased'] == 1
+
+
+def test_failed_job_waits_for_its_backoff(queue):
+    queue.enqueue(['/scans/a.jpg'])
+    job = queue.lease('w1')
+    before = time.time()
+    
+    assert queue.fail(job['id'], 'w1', 'boom')
+    
+    assert queue.lease('w1') is None
+    status = queue.status()
+    assert (status['pending'], status['waiting_retry']) == (1, 1)
+    not_before = queue.connection.execute('SELECT not_before FROM jobs').fetchone()[0]
+    assert before + RETRY_BASE_SECONDS <= not_before <= time.time() + RETRY_BASE_SECONDS
+
+
+def test_backoff_doubles_per_attempt(queue):
+    queue.enqueue(['/scans/a.jpg'])
+    delays = []
+    for _ in range(2):
+        queue.connection.execute('UPDATE jobs SET not_before = NULL')
+        job = queue.lease('w1')
+        now = time.time()
+        queue.fail(job['id'], 'w1', 'boom')
+        delays.append(queue.connection.execute('SELECT not_before FROM jobs').fetchone()[0] - now)
+    
+    assert delays[0] == pytest.approx(RETRY_BASE_SECONDS, abs=1)
+    assert delays[1] == pytest.approx(2 * RETRY_BASE_SECONDS, abs=1)
+
+
+def test_job_is_dead_after_max_attempts_and_can_be_requeued(queue):
+    queue.enqueue(['/scans/a.jpg'])
+    for attempt in range(1, 4):
+        job = queue.lease('w1')
+        assert job['attempts'] == attempt
+        queue.fail(job['id'], 'w1', f'boom {attempt}', retry_delay=0)
+    
+    assert queue.lease('w1') is None
+    status = queue.status()
+    assert (status['dead'], status['pending']) == (1, 0)
+    row = queue.connection.execute('SELECT last_error FROM jobs').fetchone()
+    assert row['last_error'] == 'boom 3'
+    
+    assert queue.requeue_dead() == 1
+    assert queue.lease('w1')['attempts'] == 1
+
+
+def test_transient_failures_give_the_attempt_back(queue, monkeypatch):
+    monkeypatch.setattr(job_queue, 'DEFAULT_MAX_TRANSIENT_FAILURES', 5)
+    queue.enqueue(['/scans/a.jpg'])
+    
+    for _ in range(4):
+        job = queue.lease('w1')
+        assert job['attempts'] == 1
+        queue.fail(job['id'], 'w1', 'connection refused', transient=True, retry_delay=0)
+    assert queue.status()['pending'] == 1
+    
+    # An image that keeps timing out is still dead-lettered eventually
+    job = queue.lease('w1')
+    queue.fail(job['id'], 'w1', 'timed out', transient=True, retry_delay=0)
+    assert queue.status()['dead'] == 1
+
+
+def test_expired_lease_goes_to_the_next_worker(queue):
+    queue.enqueue(['/scans/a.jpg'])
+    first = queue.lease('w1', lease_seconds=-1)  # already expired: the worker hung
+    
+    second = queue.lease('w2')
+    
+    assert second['id'] == first['id']
+    assert second['attempts'] == 2
+    assert not queue.complete(first['id'], 'w1', {})
+    assert queue.complete(second['id'], 'w2', {})
+
+
+def test_expired_lease_without_attempts_left_is_dead(queue):
+    queue.enqueue(['/scans/a.jpg'])
+    for worker in ('w1', 'w2', 'w3'):
+        assert queue.lease(worker, lease_seconds=-1) is not None
+    
+    assert queue.lease('w4') is None
+    dead = queue.connection.execute('SELECT status, last_error FROM jobs').fetchone()
+    assert (dead['status'], dead['last_error']) == ('dead', 'lease expired')
+
+
+def test_queue_created_before_retry_backoff_is_migrated(tmp_path):
+    db_path = str(tmp_path / 'old.db')
+    connection = sqlite3.connect(db_path)
+    connection.executescript("""
+        CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY, filepath TEXT NOT NULL UNIQUE, status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0, lease_owner TEXT, lease_expires REAL,
+            enqueued_at REAL NOT NULL, updated_at REAL NOT NULL, last_error TEXT, result TEXT
+        );
+        INSERT INTO jobs (filepath, enqueued_at, updated_at) VALUES ('/scans/a.jpg', 0, 0);
+    """)
+    connection.close()
+    
+    queue = JobQueue(db_path)
+    job = queue.lease('w1')
+    assert job['filepath'] == '/scans/a.jpg'
+    assert queue.fail(job['id'], 'w1', 'boom', transient=True)
+    queue.close()
@@ -0,0 +1,48 @@
+from model_evaluator import ModelEvaluator
+
+
+def evaluation(name, accuracy, p95):
+    return {'model_name': name, 'prompt_profile': 'default', 'prompt': 'Read the number.',
+            'accuracy': accuracy, 'p95_latency_seconds': p95, 'images_per_second': 1.0}
+
+
+def names(configs):
+    return [config['model_name'] for config in configs]
+
+
+def test_frontier_drops_dominated_configs_and_sorts_fastest_first():
+    evaluations = [
+        evaluation('accurate', 0.95, 4.0),
+        evaluation('fast', 0.70, 0.8),
+        evaluation('balanced', 0.90, 1.5),
+        evaluation('worse-and-slower', 0.85, 2.0),
+        evaluation('same-accuracy-slower', 0.90, 1.6),
+    ]
+    
+    assert names(ModelEvaluator.pareto_frontier(evaluations)) == ['fast', 'balanced', 'accurate']
+
+
+def test_identical_configs_do_not_dominate_each_other():
+    frontier = ModelEvaluator.pareto_frontier([evaluation('a', 0.9, 1.0), evaluation('b', 0.9, 1.0)])
+    
+    assert names(frontier) == ['a', 'b']
+
+
+def test_frontier_of_nothing_is_empty():
+    assert ModelEvaluator.pareto_frontier([]) == []
+
+
+def test_recommendation_is_the_fastest_config_with_the_best_accuracy(tmp_path):
+    labels = tmp_path / 'labels.csv'
+    labels.write_text('a.jpg,120\n')
+    evaluator = ModelEvaluator(str(labels), {'models': [], 'prompt_profiles': {}, 'host': 'http://gpu-box:11434'})
+    frontier = ModelEvaluator.pareto_frontier([
+        evaluation('fast', 0.70, 0.8),
+        evaluation('accurate', 0.95, 4.0),
+    ])
+    
+    recommended = evaluator.recommend(frontier)
+    
+    assert recommended['model_name'] == 'accurate'
+    assert recommended['host'] == 'http://gpu-box:11434'
+    assert evaluator.recommend([]) is None
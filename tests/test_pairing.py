@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from batch_processor import BatchFiberProcessor
+
+
+@pytest.fixture
+def processor():
+    # The pairing helpers use no detector, so skip __init__ and the Ollama client it builds
+    return BatchFiberProcessor.__new__(BatchFiberProcessor)
+
+
+def paths(*names):
+    return [os.path.join('scans', name) for name in names]
+
+
+def pair(before, after, series):
+    before, after = paths(before, after)
+    return {'before': before, 'after': after, 'series': series}
+
+
+def test_pattern_pairs_before_with_after(processor):
+    files = paths('reel1_before.jpg', 'reel1_after.jpg', 'reel2_BEFORE.png', 'reel2_after.png', 'notes.jpg')
+    
+    pairs = processor._pairs_from_pattern(files)
+    
+    assert pairs == [
+        pair('reel1_before.jpg', 'reel1_after.jpg', 'reel1'),
+        pair('reel2_BEFORE.png', 'reel2_after.png', 'reel2'),
+    ]
+
+
+def test_pattern_skips_before_without_after(processor, capsys):
+    pairs = processor._pairs_from_pattern(paths('reel1_before.jpg', 'reel2_after.jpg'))
+    
+    assert pairs == []
+    assert "No 'after' image for reel1_before.jpg" in capsys.readouterr().out
+
+
+def test_pattern_with_custom_tags(processor):
+    pairs = processor._pairs_from_pattern(paths('drum7-start.jpg', 'drum7-end.jpg'), 'start', 'end')
+    
+    assert pairs == [pair('drum7-start.jpg', 'drum7-end.jpg', 'drum7')]
+
+
+def test_series_pairs_consecutive_images_in_natural_order(processor):
+    files = paths('reel4711_10.jpg', 'reel4711_2.jpg', 'reel4711_1.jpg', 'cable-3.jpg', 'cable-4.jpg')
+    
+    pairs = processor._pairs_from_series(files)
+    
+    assert pairs == [
+        pair('reel4711_1.jpg', 'reel4711_2.jpg', 'reel4711'),
+        pair('reel4711_2.jpg', 'reel4711_10.jpg', 'reel4711'),
+        pair('cable-3.jpg', 'cable-4.jpg', 'cable'),
+    ]
+
+
+def test_series_with_a_single_image_has_no_pairs(processor):
+    assert processor._pairs_from_series(paths('lonely_1.jpg', 'other.jpg')) == []
@@ -0,0 +1,197 @@
+"""Detector, batch, queue and evaluation runs against the scripted stand-in Ollama server"""
+import json
+import threading
+import time
+
+import pytest
+
+pytestmark = pytest.mark.usefixtures('ollama_client')
+
+
+def model_script(**behavior):
+    return {'models': {'llava-phi3': behavior}}
+
+
+def track_concurrency(httpd):
+    """Record the most requests the server was answering at once in httpd.peak"""
+    respond = httpd.state.respond
+    lock = threading.Lock()
+    httpd.active = httpd.peak = 0
+    
+    def counted(model_name, image_bytes):
+        with lock:
+            httpd.active += 1
+            httpd.peak = max(httpd.peak, httpd.active)
+        try:
+            return respond(model_name, image_bytes)
+        finally:
+            with lock:
+                httpd.active -= 1
+    
+    httpd.state.respond = counted
+
+
+@pytest.fixture
+def processor_for(monkeypatch):
+    """Build a BatchFiberProcessor pointed at a stand-in server, without quality gate or results store"""
+    from batch_processor import BatchFiberProcessor
+    
+    def build(url, **options):
+        monkeypatch.setenv('FIBER_SCHEDULER_URL', url)
+        return BatchFiberProcessor(quality_gate=False, results_store=None, **options)
+    
+    return build
+
+
+def test_detector_reads_the_scripted_reply(stand_in, images):
+    from fiber_detector import FiberLengthDetector
+    httpd, url = stand_in(model_script(responses={'img0.jpg': 'The label clearly shows 120 meters.'},
+                                       default_response='I cannot read the number.'), str(images))
+    detector = FiberLengthDetector(host=url)
+    
+    found = detector.process_image(str(images / 'img0.jpg'))
+    missing = detector.process_image(str(images / 'img1.jpg'))
+    
+    assert found['detected_length'] == 120.0
+    assert found['unit'] == 'meters'
+    assert found['confidence'] == 70  # 50 + measurement term + 'clearly' + 'shows'
+    assert missing['detected_length'] is None
+    assert 'error' not in missing
+    assert httpd.state.request_counts == {'llava-phi3': 2}
+
+
+def test_detector_reports_server_errors(stand_in, images):
+    from fiber_detector import FiberLengthDetector
+    _, url = stand_in(model_script(error_rate=1.0))
+    
+    result = FiberLengthDetector(host=url).process_image(str(images / 'img0.jpg'))
+    
+    assert 'scripted failure' in result['error']
+    assert not result.get('transient')
+
+
+def test_unreachable_server_is_a_transient_error(images):
+    from fiber_detector import FiberLengthDetector
+    
+    result = FiberLengthDetector(host='http://127.0.0.1:9').process_image(str(images / 'img0.jpg'))
+    
+    assert result['transient']
+
+
+def test_voting_stops_once_enough_samples_agree(stand_in, images):
+    from fiber_detector import FiberLengthDetector
+    httpd, url = stand_in(model_script(default_response='It reads 42 m'))
+    detector = FiberLengthDetector(host=url, vote_k=3, vote_max_samples=7)
+    
+    result = detector.process_image(str(images / 'img0.jpg'))
+    
+    assert result['detected_length'] == 42.0
+    assert result['vote_agreed']
+    assert result['samples_used'] == 3
+    assert result['confidence'] == 100
+    assert httpd.state.request_counts['llava-phi3'] == 3
+
+
+def test_batch_run_summary(stand_in, images, processor_for):
+    _, url = stand_in(model_script(default_response='120 m'))
+    processor = processor_for(url)
+    
+    processor.process_directory(str(images), 'results.json')
+    
+    summary = json.loads((images / 'results.json').read_text())
+    counts = summary['processing_summary']
+    assert (counts['total_files'], counts['successfully_processed'], counts['failed_files']) == (4, 4, 0)
+    assert [r['detected_length'] for r in summary['results']] == [120.0] * 4
+    assert summary['unprocessed_files'] == []
+
+
+def test_failed_files_are_not_counted_as_successful(stand_in, images, processor_for, capsys):
+    _, url = stand_in(model_script(error_rate=1.0))
+    processor = processor_for(url)
+    
+    processor.process_directory(str(images), 'results.json')
+    
+    counts = json.loads((images / 'results.json').read_text())['processing_summary']
+    assert (counts['successfully_processed'], counts['failed_files']) == (0, 4)
+    assert "Successfully processed: 0/4 files" in capsys.readouterr().out
+
+
+def test_voting_requests_share_the_batch_concurrency_limit(stand_in, images, processor_for):
+    httpd, url = stand_in(model_script(latency_seconds=0.05, parallel=8,
+                                       default_response=['12 m', '13 m', '14 m']))
+    track_concurrency(httpd)
+    processor = processor_for(url, initial_concurrency=2, max_concurrency=2, vote_k=3)
+    
+    processor.process_directory(str(images), 'results.json')
+    
+    assert httpd.peak <= 2
+    counts = json.loads((images / 'results.json').read_text())['processing_summary']
+    assert counts['successfully_processed'] == 4
+
+
+def test_budget_leaves_files_for_a_resumed_run(stand_in, images, processor_for):
+    _, url = stand_in(model_script(default_response='120 m'))
+    processor = processor_for(url, initial_concurrency=1, max_concurrency=1)
+    
+    processor.process_directory(str(images), 'first.json', max_inferences=2)
+    first = json.loads((images / 'first.json').read_text())
+    assert first['run_limits']['stopped_early'] == 'budget'
+    assert len(first['unprocessed_files']) == 2
+    
+    processor.process_directory(str(images), 'second.json', resume_from=str(images / 'first.json'))
+    second = json.loads((images / 'second.json').read_text())
+    assert second['processing_summary']['successfully_processed'] == 4
+    assert second['unprocessed_files'] == []
+
+
+def test_image_timeout_covers_all_requests_of_an_image(stand_in, images, processor_for):
+    # Every sample disagrees, so voting would need 7 requests (3 waves)
+    _, url = stand_in(model_script(latency_seconds=0.3, parallel=8,
+                                   default_response=['12 m', '13 m', '14 m', '15 m']))
+    processor = processor_for(url, initial_concurrency=4, max_concurrency=4, vote_k=3)
+    
+    start = time.time()
+    processor.process_directory(str(images), 'results.json', image_timeout=0.1)
+    
+    assert time.time() - start < 2
+    summary = json.loads((images / 'results.json').read_text())
+    assert summary['processing_summary']['failed_files'] == 4
+    assert all('Image timeout' in r['error'] for r in summary['results'])
+    assert processor.detector.image_timeout is None  # disarmed after the run
+
+
+def test_queue_worker_drains_the_queue(stand_in, images, tmp_path, monkeypatch):
+    from job_queue import JobQueue, run_worker
+    _, url = stand_in(model_script(default_response='120 m'))
+    monkeypatch.setenv('FIBER_SCHEDULER_URL', url)
+    db_path = str(tmp_path / 'jobs.db')
+    queue = JobQueue(db_path)
+    queue.enqueue(str(path) for path in sorted(images.iterdir()))
+    queue.close()
+    
+    assert run_worker(db_path, poll_seconds=0.05) == 4
+    
+    queue = JobQueue(db_path)
+    assert queue.status()['done'] == 4
+    queue.close()
+
+
+def test_evaluator_finds_the_pareto_frontier(stand_in, images, tmp_path):
+    from model_evaluator import ModelEvaluator
+    _, url = stand_in({'models': {
+        'slow-accurate': {'latency_seconds': 0.05, 'default_response': '120 m'},
+        'fast-wrong': {'default_response': '121 m'},
+        'slow-wrong': {'latency_seconds': 0.05, 'default_response': '7 m'},
+    }})
+    labels = tmp_path / 'labels.csv'
+    labels.write_text('filename,expected_length\n' +
+                      ''.join(f'images/{path.name},120\n' for path in sorted(images.iterdir())))
+    evaluator = ModelEvaluator(str(labels), {'models': ['slow-accurate', 'fast-wrong', 'slow-wrong'],
+                                             'prompt_profiles': {'default': 'Read the number.'},
+                                             'host': url})
+    
+    report = evaluator.evaluate()
+    
+    assert report['pareto_frontier'] == ['fast-wrong / default', 'slow-accurate / default']
+    assert report['recommended']['model_name'] == 'slow-accurate'
+    assert report['recommended']['accuracy'] == 1.0
@@ -0,0 +1,74 @@
+from tiling import plan_tiles, merge_tile_results
+
+
+def tile_job(index, box, result, frame=0, frame_count=1):
+    return {'tile_index': index, 'box': box, 'frame': frame, 'frame_count': frame_count, 'result': result}
+
+
+def test_small_frame_is_one_tile():
+    assert plan_tiles(1200, 800) == [(0, 0, 1200, 800)]
+
+
+def test_large_frame_tiles_cover_it_with_overlap():
+    boxes = plan_tiles(3000, 2000, tile_size=1024, overlap=192)
+    
+    assert boxes[0][:2] == (0, 0)
+    assert max(box[2] for box in boxes) == 3000
+    assert max(box[3] for box in boxes) == 2000
+    assert all(box[2] - box[0] == 1024 and box[3] - box[1] == 1024 for box in boxes)
+    # Neighbours in a row share the overlap
+    row = sorted(box for box in boxes if box[1] == 0)
+    assert all(left[2] - right[0] >= 192 for left, right in zip(row, row[1:]))
+
+
+def test_same_number_in_overlapping_tiles_counts_once():
+    page = merge_tile_results([
+        tile_job(0, (0, 0, 1024, 1024), {'detected_length': 120.0, 'confidence': 60}),
+        tile_job(1, (832, 0, 1856, 1024), {'detected_length': 120.0, 'confidence': 85}),
+    ])
+    
+    assert page['detected_length'] == 120.0
+    assert page['confidence'] == 85
+    assert len(page['readings']) == 1
+    assert page['readings'][0]['tile_index'] == 1
+    assert page['tiles'] == 2
+
+
+def test_same_number_in_separate_tiles_counts_twice():
+    page = merge_tile_results([
+        tile_job(0, (0, 0, 1024, 1024), {'detected_length': 50.0, 'confidence': 70}),
+        tile_job(1, (2000, 0, 3024, 1024), {'detected_length': 50.0, 'confidence': 70}),
+    ])
+    
+    assert [r['value'] for r in page['readings']] == [50.0, 50.0]
+    assert page['additional_numbers'] == [50.0]
+
+
+def test_most_confident_reading_wins_and_secondary_numbers_are_discounted():
+    page = merge_tile_results([
+        tile_job(0, (0, 0, 1024, 1024), {'detected_length': 7.0, 'confidence': 60, 'additional_numbers': [300.0]}),
+        tile_job(1, (0, 2000, 1024, 3024), {'detected_length': 1500.0, 'confidence': 90}),
+    ])
+    
+    assert page['detected_length'] == 1500.0
+    assert page['unit'] == 'meters'
+    secondary = next(r for r in page['readings'] if r['value'] == 300.0)
+    assert secondary['confidence'] == 40
+    # Readings are listed top to bottom
+    assert [r['value'] for r in page['readings']] == [7.0, 300.0, 1500.0]
+
+
+def test_page_fails_only_when_every_tile_failed():
+    partly = merge_tile_results([
+        tile_job(0, (0, 0, 1024, 1024), {'detected_length': None, 'error': 'boom'}),
+        tile_job(1, (832, 0, 1856, 1024), {'detected_length': 'Not detected', 'confidence': 0}),
+    ])
+    assert partly['detected_length'] is None
+    assert partly['unit'] == 'N/A'
+    assert 'error' not in partly
+    
+    failed = merge_tile_results([
+        tile_job(0, (0, 0, 1024, 1024), {'detected_length': None, 'error': 'boom'}),
+        tile_job(1, (832, 0, 1856, 1024), {'detected_length': None, 'error': 'bang'}),
+    ])
+    assert failed['error'] == 'boom'
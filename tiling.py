@@ -0,0 +1,158 @@
+import io
+import base64
+import itertools
+from image_payload import EncodedImage, encode_image_bytes
+from archive_ingest import split_member_path, iter_member_bytes
+
+# Frames up to this size (longest side, pixels) are sent whole
+DEFAULT_MAX_SIDE = 1600
+DEFAULT_TILE_SIZE = 1024
+# Large enough that a handwritten number cut by one tile edge is whole in the neighbour
+DEFAULT_OVERLAP = 192
+
+
+def plan_tiles(width, height, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP, max_side=DEFAULT_MAX_SIDE):
+    """
+    Split a frame into overlapping tiles
+    
+    Returns:
+        list: (left, top, right, bottom) boxes covering the whole frame
+    """
+    if max(width, height) <= max_side:
+        return [(0, 0, width, height)]
+    
+    stride = max(1, tile_size - overlap)
+    
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)  # last tile flush with the edge
+        return positions
+    
+    return [
+        (left, top, min(left + tile_size, width), min(top + tile_size, height))
+        for top in starts(height)
+        for left in starts(width)
+    ]
+
+
+def _encode_tile(image):
+    """JPEG-encode a decoded tile into a base64 payload"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return EncodedImage(base64.b64encode(buffer.getbuffer()))
+
+
+def iter_tile_jobs(image_paths, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP, max_side=DEFAULT_MAX_SIDE):
+    """
+    Lazily yield one inference job per tile of every frame of every image
+    
+    Only one frame per file is decoded at a time and a tile is cropped and
+    encoded only when the consumer asks for its job, so memory is bounded by
+    the frame being tiled plus the tiles currently in flight.
+    
+    Archive members ("bundle.zip!sheet.tif") come after plain files and are
+    streamed with iter_member_bytes, one decompression pass per archive.
+    
+    Yields dicts with filepath, frame, frame_count, box, tile_index, tile_count
+    and payload. payload is None when a plain file is a single small frame that
+    can be sent unchanged.
+    """
+    from PIL import Image
+    
+    members = [path for path in image_paths if split_member_path(path)[1] is not None]
+    files = ((path, None, None) for path in image_paths if split_member_path(path)[1] is None)
+    
+    for image_path, data, read_error in itertools.chain(files, iter_member_bytes(members)):
+        try:
+            if read_error is not None:
+                raise Exception(f"Failed to read archive member: {read_error}")
+            with Image.open(io.BytesIO(data) if data is not None else image_path) as image:
+                frame_count = getattr(image, 'n_frames', 1)
+                
+                for frame_index in range(frame_count):
+                    image.seek(frame_index)
+                    boxes = plan_tiles(image.width, image.height, tile_size, overlap, max_side)
+                    
+                    if frame_count == 1 and len(boxes) == 1:
+                        # A member's bytes are already in hand; don't read it from the archive again
+                        payload = encode_image_bytes(data) if data is not None else None
+                        yield {'filepath': image_path, 'frame': 0, 'frame_count': 1, 'box': boxes[0],
+                               'tile_index': 0, 'tile_count': 1, 'payload': payload}
+                        continue
+                    
+                    frame = image.convert('RGB')
+                    for tile_index, box in enumerate(boxes):
+                        yield {'filepath': image_path, 'frame': frame_index, 'frame_count': frame_count,
+                               'box': box, 'tile_index': tile_index, 'tile_count': len(boxes),
+                               'payload': _encode_tile(frame.crop(box))}
+                    del frame
+        except Exception as e:
+            yield {'filepath': image_path, 'frame': 0, 'frame_count': 0, 'box': None,
+                   'tile_index': 0, 'tile_count': 1, 'payload': None, 'error': str(e)}
+
+
+def _boxes_overlap(box1, box2):
+    return box1[0] < box2[2] and box2[0] < box1[2] and box1[1] < box2[3] and box2[1] < box1[3]
+
+
+def merge_tile_results(page_jobs):
+    """
+    Merge the per-tile results of one page into a single result
+    
+    The same number read by two overlapping tiles counts as one reading
+    (the more confident one is kept). The page's detected_length is its most
+    confident reading; all readings are listed with the tile box they came from.
+    
+    Args:
+        page_jobs: Jobs of one frame, each with a 'result' dict from the detector
+    """
+    readings = []
+    errors = []
+    
+    for job in sorted(page_jobs, key=lambda j: j['tile_index']):
+        result = job.get('result') or {}
+        if 'error' in result:
+            errors.append(result['error'])
+        
+        length = result.get('detected_length')
+        if length is None or length == 'Not detected':
+            continue
+        
+        confidence = result.get('confidence', 0)
+        values = [length] + list(result.get('additional_numbers', []))
+        for position, value in enumerate(values):
+            reading = {
+                'value': value,
+                'unit': 'meters',
+                # Secondary numbers in a tile are less likely to be the label
+                'confidence': confidence if position == 0 else max(0, confidence - 20),
+                'box': list(job['box']),
+                'tile_index': job['tile_index']
+            }
+            duplicate = next((r for r in readings
+                              if r['value'] == value and _boxes_overlap(r['box'], reading['box'])), None)
+            if duplicate is None:
+                readings.append(reading)
+            elif reading['confidence'] > duplicate['confidence']:
+                duplicate.update(reading)
+    
+    readings.sort(key=lambda r: (r['box'][1], r['box'][0]))
+    best = max(readings, key=lambda r: r['confidence']) if readings else None
+    first = page_jobs[0]
+    
+    result = {
+        'detected_length': best['value'] if best else None,
+        'unit': 'meters' if best else 'N/A',
+        'confidence': best['confidence'] if best else 0,
+        'method': 'Ollama Model (tiled)',
+        'additional_numbers': [r['value'] for r in readings if r is not best],
+        'readings': readings,
+        'frame': first['frame'],
+        'frame_count': first['frame_count'],
+        'tiles': len(page_jobs)
+    }
+    if errors and len(errors) == len(page_jobs):
+        result['error'] = errors[0]
+    return result
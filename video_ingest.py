@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fiber_detector import InferenceCancelled, carry_context
+
+VIDEO_EXTENSIONS = ['*.mp4', '*.mov', '*.avi', '*.mkv', '*.m4v', '*.webm']
+
+# Frames are scored on a small grayscale copy; sharpness and change don't need full resolution
+ANALYSIS_WIDTH = 320
+DEFAULT_MAX_KEYFRAMES = 5
+DEFAULT_SAMPLE_FPS = 5.0
+# Mean absolute grayscale difference (0-255) that counts as a new view
+DEFAULT_MIN_CHANGE = 6.0
+# Keyframes sharper than this fraction of the sharpest frame seen so far are kept
+DEFAULT_MIN_RELATIVE_SHARPNESS = 0.35
+
+
+def _analysis_frame(frame):
+    """Small grayscale float copy of a BGR frame"""
+    import cv2
+    import numpy as np
+    
+    height, width = frame.shape[:2]
+    if width > ANALYSIS_WIDTH:
+        frame = cv2.resize(frame, (ANALYSIS_WIDTH, int(height * ANALYSIS_WIDTH / width)),
+                           interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return gray.astype(np.float32)
+
+
+def sharpness_score(gray):
+    """Variance of a 4-neighbour Laplacian (numpy only); higher is sharper"""
+    laplacian = (gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1]
+                 - 4.0 * gray[1:-1, 1:-1])
+    return float(laplacian.var())
+
+
+def change_score(gray, previous_gray):
+    """Mean absolute difference between two analysis frames"""
+    import numpy as np
+    if previous_gray is None or previous_gray.shape != gray.shape:
+        return float('inf')
+    return float(np.abs(gray - previous_gray).mean())
+
+
+def select_keyframes(source, max_keyframes=DEFAULT_MAX_KEYFRAMES, sample_fps=DEFAULT_SAMPLE_FPS,
+                     min_change=DEFAULT_MIN_CHANGE, min_relative_sharpness=DEFAULT_MIN_RELATIVE_SHARPNESS,
+                     max_seconds=None):
+    """
+    Stream a video file or camera and pick a few sharp, distinct keyframes
+    
+    Frames are decoded one at a time; only sample_fps frames per second are
+    scored. The stream is cut into segments wherever the view changes by more
+    than min_change, and the sharpest frame of each segment is a candidate.
+    The max_keyframes sharpest candidates are kept, so only those full-size
+    frames are ever held in memory.
+    
+    Args:
+        source: Video file path or camera index (int)
+        max_keyframes: Upper bound on frames returned (= inferences spent)
+        sample_fps: Frames per second that get scored
+        min_change: Mean grayscale difference that starts a new segment
+        min_relative_sharpness: Drop candidates blurrier than this fraction of the sharpest
+        max_seconds: Stop reading a live camera after this many seconds
+        
+    Returns:
+        (keyframes, stats): keyframes is a list of dicts with frame_index,
+        timestamp_seconds, sharpness and the BGR frame
+    """
+    import cv2
+    
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise Exception(f"Cannot open video source: {source}")
+    
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, int(round(fps / sample_fps))) if sample_fps else 1
+    
+    candidates = []
+    segment_best = None
+    segment_anchor = None
+    frame_index = -1
+    scored = 0
+    start_time = time.time()
+    
+    def close_segment():
+        if segment_best is not None:
+            candidates.append(segment_best)
+            # Keep only what could still make the final cut
+            candidates.sort(key=lambda c: -c['sharpness'])
+            del candidates[max_keyframes:]
+    
+    try:
+        while True:
+            # grab() skips decoding for frames that aren't scored
+            if not capture.grab():
+                break
+            frame_index += 1
+            if frame_index % step:
+                continue
+            if max_seconds is not None and time.time() - start_time > max_seconds:
+                break
+            
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            scored += 1
+            
+            gray = _analysis_frame(frame)
+            sharpness = sharpness_score(gray)
+            
+            if change_score(gray, segment_anchor) > min_change:
+                close_segment()
+                segment_best = None
+                segment_anchor = gray
+            
+            if segment_best is None or sharpness > segment_best['sharpness']:
+                segment_best = {
+                    'frame_index': frame_index,
+                    'timestamp_seconds': round(frame_index / fps, 3),
+                    'sharpness': round(sharpness, 2),
+                    'frame': frame
+                }
+        close_segment()
+    finally:
+        capture.release()
+    
+    if candidates:
+        sharpest = candidates[0]['sharpness']
+        candidates = [c for c in candidates if c['sharpness'] >= sharpest * min_relative_sharpness]
+    candidates.sort(key=lambda c: c['frame_index'])
+    
+    stats = {
+        'frames_read': frame_index + 1,
+        'frames_scored': scored,
+        'source_fps': round(fps, 2),
+        'keyframes_selected': len(candidates)
+    }
+    return candidates, stats
+
+
+def encode_keyframe(frame):
+    """JPEG-encode a BGR frame into a base64 payload for the detector"""
+    import cv2
+    import base64
+    from image_payload import EncodedImage
+    
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    if not ok:
+        raise Exception("Failed to encode keyframe")
+    return EncodedImage(base64.b64encode(buffer.tobytes()))
+
+
+def fuse_readings(frame_results):
+    """
+    Fuse per-keyframe readings into one result
+    
+    Each keyframe votes for its detected length with its confidence as weight;
+    the winner's confidence is its share of the total weight.
+    """
+    weights = {}
+    for frame_result in frame_results:
+        length = frame_result.get('detected_length')
+        if length is None or length == 'Not detected' or 'error' in frame_result:
+            continue
+        weights[length] = weights.get(length, 0) + max(1, frame_result.get('confidence', 0))
+    
+    if not weights:
+        return None, 0, {}
+    
+    total = sum(weights.values())
+    winner = max(weights, key=weights.get)
+    return winner, round(100 * weights[winner] / total), weights
+
+
+def process_video(detector, source, **selection_options):
+    """
+    Read the drum label from a video file or camera stream
+    
+    Args:
+        detector: FiberLengthDetector used for the keyframes
+        source: Video file path or camera index
+        selection_options: Passed to select_keyframes
+        
+    Returns:
+        dict: Fused analysis result with per-keyframe readings
+    """
+    start_time = time.time()
+    source_name = os.path.basename(source) if isinstance(source, str) else f"camera {source}"
+    
+    try:
+        keyframes, stats = select_keyframes(source, **selection_options)
+        print(f"🎞️  {source_name}: {stats['frames_read']} frames, "
+              f"{stats['frames_scored']} scored, {len(keyframes)} keyframes selected")
+        
+        def read_keyframe(keyframe):
+            payload = encode_keyframe(keyframe.pop('frame'))
+            name = f"{source_name} @ {keyframe['timestamp_seconds']}s"
+            try:
+                return detector._extract_number(payload, name)
+            except InferenceCancelled:
+                raise  # the clip is retried as a whole on the next run
+            except Exception as e:
+                return {'detected_length': None, 'confidence': 0, 'error': str(e)}
+        
+        # The handful of keyframes are read concurrently; in a batch run each request
+        # still waits for a slot under the batch's concurrency limit
+        with ThreadPoolExecutor(max_workers=max(1, len(keyframes))) as executor:
+            results = list(executor.map(carry_context(read_keyframe), keyframes))
+        
+        frame_results = []
+        for keyframe, result in zip(keyframes, results):
+            keyframe.update({
+                'detected_length': result.get('detected_length'),
+                'confidence': result.get('confidence', 0),
+                'raw_text': result.get('raw_text', result.get('error', ''))
+            })
+            if 'error' in result:
+                keyframe['error'] = result['error']
+            frame_results.append(keyframe)
+        
+        length, confidence, weights = fuse_readings(frame_results)
+        others = sorted(set(r['detected_length'] for r in frame_results
+                            if r['detected_length'] is not None and r['detected_length'] != length))
+        
+        return {
+            'detected_length': length,
+            'unit': 'meters' if length is not None else 'N/A',
+            'confidence': confidence,
+            'method': 'Ollama Model (video keyframes)',
+            'raw_text': '\n'.join(f"[{r['timestamp_seconds']}s] {r['raw_text']}" for r in frame_results),
+            'additional_numbers': others,
+            'model_used': detector.model_name,
+            'keyframes': frame_results,
+            'reading_weights': {str(k): v for k, v in weights.items()},
+            'inferences_used': len(frame_results),
+            'video_stats': stats,
+            'processing_time_seconds': round(time.time() - start_time, 2)
+        }
+    except Exception as e:
+        result = {
+            'detected_length': 'Not detected',
+            'unit': 'N/A',
+            'confidence': 0,
+            'method': 'Ollama Model (video keyframes)',
+            'raw_text': f'Error: {str(e)}',
+            'additional_numbers': [],
+            'error': str(e)
+        }
+        if isinstance(e, InferenceCancelled):
+            result['cancelled'] = True
+        return result
+
+
+def main():
+    import argparse
+    from fiber_detector import FiberLengthDetector
+    
+    parser = argparse.ArgumentParser(description="Read the drum label length from a video or camera")
+    parser.add_argument('source', help="Video file, or a camera index such as 0")
+    parser.add_argument('--seconds', type=float, help="Stop reading a camera after this many seconds")
+    parser.add_argument('--keyframes', type=int, default=DEFAULT_MAX_KEYFRAMES, help="Maximum inferences")
+    parser.add_argument('--model', default='llava-phi3')
+    args = parser.parse_args()
+    
+    source = int(args.source) if args.source.isdigit() else args.source
+    if isinstance(source, int) and args.seconds is None:
+        args.seconds = 10.0
+    
+    print("🚀 Fiber Length Video Reader")
+    print("=" * 40)
+    detector = FiberLengthDetector(args.model, priority='interactive')
+    result = process_video(detector, source, max_keyframes=args.keyframes, max_seconds=args.seconds)
+    
+    if 'error' in result:
+        print(f"❌ {result['error']}")
+        sys.exit(1)
+    
+    print(f"\n{'='*60}")
+    if result['detected_length'] is not None:
+        print(f"✅ Fused reading: {result['detected_length']} {result['unit']} "
+              f"(confidence: {result['confidence']}%, {result['inferences_used']} inferences)")
+    else:
+        print(f"❌ No measurement detected in {result['inferences_used']} keyframes")
+    for keyframe in result['keyframes']:
+        print(f"   • {keyframe['timestamp_seconds']}s (frame {keyframe['frame_index']}, "
+              f"sharpness {keyframe['sharpness']}): {keyframe['detected_length']}")
+    
+    if isinstance(source, str):
+        output_path = os.path.splitext(source)[0] + '_video_result.json'
+        with open(output_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Results saved to: {output_path}")
+
+if __name__ == "__main__":
+    main()